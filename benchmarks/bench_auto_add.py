@@ -0,0 +1,52 @@
+"""
+Per-save cost of the auto_add post_save receiver on models other than the
+User model: connected to every model (django < 1.7) versus connected to
+the User model only.
+"""
+from __future__ import print_function
+
+from .utils import best_of, report, setup_django
+
+NUMBER = 2000
+
+
+def main():
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group
+    from django.db.models.signals import post_save
+
+    def auto_add_any_model(sender, **kwargs):
+        "The receiver as connected before app loading was used"
+        if sender == get_user_model() and kwargs['created']:
+            pass
+
+    group = Group.objects.create(name='benchmark')
+
+    def send():
+        post_save.send(sender=Group, instance=group, created=False)
+
+    def save():
+        group.save()
+
+    results = {}
+    for label in ('user model only', 'every model'):
+        if label == 'every model':
+            post_save.connect(auto_add_any_model)
+        results[label] = (
+            best_of(send, NUMBER * 10), best_of(save, NUMBER),
+        )
+    post_save.disconnect(auto_add_any_model)
+
+    for label, (send_time, save_time) in sorted(results.items()):
+        report('post_save dispatch, auto_add on ' + label, send_time)
+        report('Group.save(), auto_add on ' + label, save_time)
+    report(
+        'dispatch cost saved per unrelated save',
+        results['every model'][0] - results['user model only'][0],
+    )
+
+
+if __name__ == '__main__':
+    main()
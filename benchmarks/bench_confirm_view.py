@@ -0,0 +1,99 @@
+"""
+Requests per second and queries per request of the confirmation view, run
+in-process with django's test client against a seeded table of
+USERS * ADDRESSES_PER_USER EmailAddresses:
+
+    python -m benchmarks.bench_confirm_view --users 100000
+
+Requests go through the test project's middleware. Outside of a
+transaction, sqlite logs a BEGIN query for each UPDATE. Needs django 1.7+.
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+
+from .bench_lifecycle import measure, seed
+from .utils import setup_django
+
+
+def run(users, addresses_per_user, requests):
+    from django.conf import settings
+    from django.core.urlresolvers import reverse
+    from django.test import Client
+    from simple_email_confirmation.models import EmailAddress
+    from simple_email_confirmation.signals import email_confirmed
+
+    seed(users, addresses_per_user)
+    settings.ROOT_URLCONF = 'benchmarks.urls'
+    client = Client()
+
+    keys = list(
+        EmailAddress.objects.filter(confirmed_at__isnull=True)
+        .values_list('key', flat=True)[:requests * 3]
+    )
+    if len(keys) < requests * 3:
+        raise SystemExit('Seed more users for {0} requests'.format(requests))
+    get_keys = keys[:requests]
+    post_keys = keys[requests:requests * 2]
+    receiver_keys = keys[requests * 2:]
+
+    def url(key):
+        return reverse('simple_email_confirmation_confirm', args=[key])
+
+    def check(status_code):
+        def request(response):
+            assert response.status_code == status_code, response
+        return request
+
+    results = []
+
+    def add(name, func, inputs):
+        result = measure(name, func, inputs)
+        print('{0:<45} {1:>10.0f} requests/s'.format(
+            '', 1 / result['seconds_per_call'],
+        ))
+        results.append(result)
+
+    add('GET, unconfirmed', lambda key: check(200)(
+        client.get(url(key)),
+    ), get_keys)
+    add('POST, unconfirmed', lambda key: check(200)(
+        client.post(url(key)),
+    ), post_keys)
+
+    def receiver(sender, **kwargs):
+        pass
+    email_confirmed.connect(receiver)
+    add('GET, unconfirmed, email_confirmed receiver', lambda key: check(200)(
+        client.get(url(key)),
+    ), receiver_keys)
+    email_confirmed.disconnect(receiver)
+
+    add('GET, already confirmed', lambda key: check(200)(
+        client.get(url(key)),
+    ), get_keys)
+    etags = dict((key, client.get(url(key))['ETag']) for key in get_keys)
+    add('GET, If-None-Match, already confirmed', lambda key: check(304)(
+        client.get(url(key), HTTP_IF_NONE_MATCH=etags[key]),
+    ), get_keys)
+    add('GET, unknown key', lambda key: check(404)(
+        client.get(url(key + 'x')),
+    ), get_keys)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--addresses-per-user', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='requests per case')
+    args = parser.parse_args()
+
+    setup_django()
+    run(args.users, args.addresses_per_user, args.requests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
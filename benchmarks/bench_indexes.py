@@ -0,0 +1,111 @@
+"""
+Query plans and timings of the hot EmailAddress lookups on a large table,
+with the indexes from migration 0005 and without them. Needs django 1.7+.
+"""
+from __future__ import print_function
+
+from datetime import timedelta
+
+from .utils import best_of, report, setup_django
+
+ROWS = 100000
+
+
+def seed():
+    from django.utils import timezone
+    from simple_email_confirmation.tests.myproject.myapp.models import User
+    from simple_email_confirmation.models import EmailAddress
+
+    users = [
+        User(username='user{0}'.format(i)) for i in range(ROWS // 10)
+    ]
+    User.objects.bulk_create(users, batch_size=500)
+    user_pks = list(User.objects.values_list('pk', flat=True))
+
+    now = timezone.now()
+    addresses = []
+    for i in range(ROWS):
+        address = EmailAddress(
+            user_id=user_pks[i % len(user_pks)],
+            email='{0}@Example.com'.format(i),
+            normalized_email='{0}@example.com'.format(i),
+            set_at=now - timedelta(hours=i % 1000),
+            # a tenth of the addresses are still unconfirmed
+            confirmed_at=None if i % 10 == 0 else now,
+            requested_at=now - timedelta(hours=i % 50) if i % 5 else None,
+        )
+        address.key_digest = EmailAddress.objects.hash_key(address.key)
+        addresses.append(address)
+    EmailAddress.objects.bulk_create(addresses, batch_size=500)
+
+
+def queries():
+    from django.utils import timezone
+    from simple_email_confirmation.models import EmailAddress
+
+    cutoff = timezone.now() - timedelta(hours=990)
+    return [
+        ('lookup by email', EmailAddress.objects.filter_email(
+            '{0}@EXAMPLE.com'.format(ROWS // 2),
+        )),
+        ('expired unconfirmed', EmailAddress.objects.filter(
+            confirmed_at__isnull=True, set_at__lte=cutoff,
+        ).values_list('pk', flat=True)[:1000]),
+        ('requested before', EmailAddress.objects.filter(
+            requested_at__lte=timezone.now() - timedelta(hours=48),
+        ).values_list('pk', flat=True)[:1000]),
+    ]
+
+
+def explain(queryset, label):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == 'sqlite':
+        sql = 'EXPLAIN QUERY PLAN ' + sql
+    else:
+        sql = 'EXPLAIN ' + sql
+    # the label keeps python's sqlite3 module from reusing a statement
+    # prepared before the indexes were dropped
+    sql = '/* {0} */ {1}'.format(label, sql)
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    return [' '.join(str(column) for column in row) for row in cursor]
+
+
+def drop_indexes():
+    "Drop the indexes added in migrations 0005 and 0006"
+    from django.db import connection
+    from simple_email_confirmation.models import EmailAddress
+
+    table = EmailAddress._meta.db_table
+    cursor = connection.cursor()
+    constraints = connection.introspection.get_constraints(cursor, table)
+    for name, constraint in constraints.items():
+        if (constraint['index'] and not constraint['unique'] and
+                constraint['columns'] in (
+                    ['normalized_email'], ['requested_at'], ['set_at'],
+                    ['confirmed_at', 'set_at'])):
+            cursor.execute(
+                'DROP INDEX {0}'.format(connection.ops.quote_name(name)),
+            )
+
+
+def run(label):
+    print('== ' + label)
+    for name, queryset in queries():
+        for line in explain(queryset, label):
+            print('   plan: ' + line)
+        report(name, best_of(lambda: list(queryset.all()), 20))
+
+
+def main():
+    setup_django()
+    seed()
+    run('with indexes')
+    drop_indexes()
+    run('without indexes')
+
+
+if __name__ == '__main__':
+    main()
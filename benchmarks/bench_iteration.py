@@ -0,0 +1,57 @@
+"""
+Throughput of iterating over a large EmailAddress queryset, with and
+without a post_init receiver (how confirmation keys used to be defaulted).
+"""
+from __future__ import print_function
+
+from .utils import best_of, report, setup_django
+
+ROWS = 20000
+
+
+def main():
+    setup_django()
+
+    from django.db.models.signals import post_init
+    from simple_email_confirmation.tests.myproject.myapp.models import User
+    from simple_email_confirmation.models import EmailAddress
+
+    user = User.objects.create_user('benchmark')
+    manager = EmailAddress.objects
+    addresses = []
+    for i in range(ROWS):
+        email = '{0}@example.com'.format(i)
+        address = EmailAddress(
+            user=user, email=email,
+            normalized_email=manager.normalize_email(email),
+        )
+        address.key_digest = manager.hash_key(address.key)
+        addresses.append(address)
+    EmailAddress.objects.bulk_create(addresses, batch_size=500)
+
+    def auto_generate_confirmation_key(sender, instance, **kwargs):
+        "The receiver keys used to be defaulted with"
+        if not instance.key and not instance.key_digest:
+            instance.key = instance._default_manager.generate_key()
+
+    def iterate():
+        for address in EmailAddress.objects.all().iterator():
+            pass
+
+    without_receiver = best_of(iterate, 1, repeat=3)
+    post_init.connect(auto_generate_confirmation_key, sender=EmailAddress)
+    with_receiver = best_of(iterate, 1, repeat=3)
+    post_init.disconnect(auto_generate_confirmation_key, sender=EmailAddress)
+
+    report('iterate, post_init receiver, per row', with_receiver / ROWS)
+    report('iterate, field default, per row', without_receiver / ROWS)
+    print('{0:<50} {1:>10.0f} rows/s'.format(
+        'throughput, post_init receiver', ROWS / with_receiver,
+    ))
+    print('{0:<50} {1:>10.0f} rows/s'.format(
+        'throughput, field default', ROWS / without_receiver,
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Per-key cost of generating confirmation keys: the former
+get_random_string(24) versus generate_key() and generate_keys() in
+batches, as used by the bulk methods.
+"""
+from __future__ import print_function
+
+from .utils import best_of, report, setup_django
+
+NUMBER = 2000
+BATCH_SIZE = 500
+
+
+def main():
+    setup_django()
+
+    from django.utils.crypto import get_random_string
+    from simple_email_confirmation.models import EmailAddress
+
+    manager = EmailAddress.objects
+
+    report('get_random_string(length=24)', best_of(
+        lambda: get_random_string(length=24), NUMBER,
+    ))
+    report('generate_key()', best_of(manager.generate_key, NUMBER))
+    report('generate_keys({0}), per key'.format(BATCH_SIZE), best_of(
+        lambda: manager.generate_keys(BATCH_SIZE), NUMBER // 100,
+    ) / BATCH_SIZE)
+
+
+if __name__ == '__main__':
+    main()
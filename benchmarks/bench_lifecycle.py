@@ -0,0 +1,208 @@
+"""
+Queries and wall time per call of the confirmation lifecycle, on a seeded
+table of USERS * ADDRESSES_PER_USER EmailAddresses:
+
+    python -m benchmarks.bench_lifecycle --users 10000 --json after.json
+    python -m benchmarks.bench_lifecycle --compare before.json after.json
+
+Queries are counted while timing, so the timings include django's query
+logging overhead - compare them only with other runs of this benchmark.
+Needs django 1.7+.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .utils import setup_django
+
+
+def seed(users, addresses_per_user):
+    "Create Users with a mix of confirmed and unconfirmed addresses"
+    from django.utils import timezone
+    from simple_email_confirmation.models import EmailAddress
+    from simple_email_confirmation.tests.myproject.myapp.models import User
+
+    User.objects.bulk_create([
+        User(username='user{0}'.format(i), email='{0}@example.com'.format(i))
+        for i in range(users)
+    ], batch_size=500)
+
+    now = timezone.now()
+    manager = EmailAddress.objects
+    addresses = []
+    for pk, username in User.objects.values_list('pk', 'username'):
+        i = int(username[len('user'):])
+        for j in range(addresses_per_user):
+            email = '{0}@example.com'.format(i) if j == 0 else (
+                '{0}.{1}@example.org'.format(i, j)
+            )
+            key = manager.generate_key()
+            addresses.append(EmailAddress(
+                user_id=pk, email=email,
+                normalized_email=manager.normalize_email(email), key=key,
+                key_digest=manager.hash_key(key), set_at=now,
+                # half of the primary and most other addresses are confirmed
+                confirmed_at=now if (i + j) % 2 else None,
+            ))
+        if len(addresses) >= 5000:
+            EmailAddress.objects.bulk_create(addresses, batch_size=500)
+            addresses = []
+    EmailAddress.objects.bulk_create(addresses, batch_size=500)
+
+
+def measure(name, func, inputs, per=1):
+    """
+    Call func with each of inputs, counting queries and wall time. Each
+    call does `per` operations.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    inputs = list(inputs)
+    with CaptureQueriesContext(connection) as context:
+        start = time.time()
+        for arg in inputs:
+            func(arg)
+        seconds = time.time() - start
+    calls = len(inputs) * per
+    result = {
+        'name': name,
+        'calls': calls,
+        'queries_per_call': float(len(context)) / calls,
+        'seconds_per_call': seconds / calls,
+    }
+    print('{name:<45} {queries_per_call:>6.2f} queries '
+          '{0:>10.2f} us'.format(result['seconds_per_call'] * 1e6, **result))
+    return result
+
+
+def run(users, addresses_per_user, calls):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from simple_email_confirmation.models import EmailAddress
+
+    User = get_user_model()
+    seed(users, addresses_per_user)
+    user_pks = list(User.objects.values_list('pk', flat=True)[:calls])
+
+    def fresh_users():
+        return (User.objects.get(pk=pk) for pk in user_pks)
+
+    results = []
+
+    def add(name, func, inputs, per=1):
+        results.append(measure(name, func, inputs, per))
+
+    keys = []
+    add('create_unconfirmed', lambda user: keys.append(
+        user.add_unconfirmed_email('new@example.net'),
+    ), fresh_users())
+    add('confirm', EmailAddress.objects.confirm, keys)
+    add('confirm already confirmed', EmailAddress.objects.confirm, keys)
+    add('confirm_token', EmailAddress.objects.confirm_token, [
+        EmailAddress.objects.get(user=pk, email='new@example.net')
+        .get_confirmation_token() for pk in user_pks
+    ])
+
+    for prop in ('is_confirmed', 'confirmed_at',
+                 'has_active_confirmation_request'):
+        add(prop, lambda user: getattr(user, prop), fresh_users())
+    add('get_confirmed_emails',
+        lambda user: user.get_confirmed_emails(), fresh_users())
+    add('get_unconfirmed_emails',
+        lambda user: user.get_unconfirmed_emails(), fresh_users())
+    add('all properties, one User', lambda user: (
+        user.is_confirmed, user.confirmed_at,
+        user.has_active_confirmation_request, user.get_confirmed_emails(),
+        user.get_unconfirmed_emails(),
+    ), fresh_users())
+
+    add('add_email_if_not_exists, new', lambda user: (
+        user.add_email_if_not_exists('other@example.net')
+    ), fresh_users())
+    add('add_email_if_not_exists, existing', lambda user: (
+        user.add_email_if_not_exists('other@example.net')
+    ), fresh_users())
+
+    add('get_confirmation_statuses, 100 Users', lambda users: (
+        EmailAddress.objects.get_confirmation_statuses(users)
+    ), [list(User.objects.all()[:100]) for i in range(10)])
+
+    add('iterate all addresses, per row', lambda i: sum(
+        1 for address in EmailAddress.objects.all().iterator()
+    ), [0], per=EmailAddress.objects.count())
+
+    settings.ROOT_URLCONF = 'benchmarks.urls'
+    User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+    client = Client()
+    client.login(username='admin', password='admin')
+    url = '/admin/simple_email_confirmation/emailaddress/'
+    add('admin changelist', lambda i: client.get(url), range(5))
+    add('admin changelist search', lambda i: client.get(
+        url, {'q': '5@example.com'},
+    ), range(5))
+
+    return results
+
+
+def compare(before, after):
+    "Print how each result changed between two --json outputs"
+    with open(before) as f:
+        before = dict((r['name'], r) for r in json.load(f)['results'])
+    with open(after) as f:
+        after = json.load(f)['results']
+    for result in after:
+        old = before.get(result['name'])
+        if old is None:
+            continue
+        print('{0:<45} queries {1:>6.2f} -> {2:<6.2f} time x{3:.2f}'.format(
+            result['name'], old['queries_per_call'],
+            result['queries_per_call'],
+            result['seconds_per_call'] / old['seconds_per_call'],
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--addresses-per-user', type=int, default=10)
+    parser.add_argument('--calls', type=int, default=200,
+                        help='calls per operation')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two --json outputs, then exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    setup_django()
+
+    import django
+    from django.db import connection
+    import simple_email_confirmation
+
+    results = run(args.users, args.addresses_per_user,
+                  min(args.calls, args.users))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'version': simple_email_confirmation.__version__,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'users': args.users,
+                'addresses': args.users * args.addresses_per_user,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"URLs for benchmarks rendering admin pages and confirming addresses"
+from django.conf.urls import include, patterns, url
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = patterns(
+    '',
+    url(r'^admin/', include(admin.site.urls)),
+    url(r'^email/', include('simple_email_confirmation.urls')),
+)
@@ -0,0 +1,53 @@
+"""
+Helpers shared by the benchmarks. Benchmarks run against the test project
+settings, in a throwaway test database:
+
+    python -m benchmarks.bench_auto_add
+
+That's sqlite in memory. To run them against another database, e.g.
+postgres, set BENCH_DB_NAME (the test database is created next to it) and
+optionally BENCH_DB_ENGINE, BENCH_DB_USER, BENCH_DB_PASSWORD, BENCH_DB_HOST
+and BENCH_DB_PORT.
+"""
+from __future__ import print_function
+
+import os
+import timeit
+
+
+def setup_django():
+    "Configure django and create a throwaway test database"
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE',
+        'simple_email_confirmation.tests.myproject.settings',
+    )
+    if os.environ.get('BENCH_DB_NAME'):
+        from django.conf import settings
+        settings.DATABASES['default'] = {
+            'ENGINE': os.environ.get(
+                'BENCH_DB_ENGINE', 'django.db.backends.postgresql_psycopg2',
+            ),
+            'NAME': os.environ['BENCH_DB_NAME'],
+            'USER': os.environ.get('BENCH_DB_USER', ''),
+            'PASSWORD': os.environ.get('BENCH_DB_PASSWORD', ''),
+            'HOST': os.environ.get('BENCH_DB_HOST', ''),
+            'PORT': os.environ.get('BENCH_DB_PORT', ''),
+        }
+
+    import django
+    if hasattr(django, 'setup'):
+        django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def best_of(func, number, repeat=5):
+    "Best time per call of `func`, in seconds"
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(name, seconds):
+    print('{0:<50} {1:>10.2f} us'.format(name, seconds * 1e6))
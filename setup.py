@@ -31,6 +31,8 @@ setup(
     license='BSD',
     packages=[
         'simple_email_confirmation',
+        'simple_email_confirmation.management',
+        'simple_email_confirmation.management.commands',
         'simple_email_confirmation.migrations',
         'simple_email_confirmation.south_migrations',
         'simple_email_confirmation.tests',
@@ -1,13 +1,24 @@
 __version__ = '0.12'
 __all__ = [
     'SimpleEmailConfirmationUserMixin',
+    'SimpleEmailConfirmationUserQuerySet',
     'EmailAddress',
+    'EmailConfirmationStatus',
     'email_confirmed',
     'unconfirmed_email_created',
+    'unconfirmed_emails_created',
     'primary_email_changed',
 ]
 
-from .models import SimpleEmailConfirmationUserMixin, EmailAddress
+from .models import (
+    SimpleEmailConfirmationUserMixin, SimpleEmailConfirmationUserQuerySet,
+    EmailAddress, EmailConfirmationStatus,
+)
 from .signals import (
-    email_confirmed, unconfirmed_email_created, primary_email_changed,
+    email_confirmed, unconfirmed_email_created, unconfirmed_emails_created,
+    primary_email_changed,
+)
+
+default_app_config = (
+    'simple_email_confirmation.apps.SimpleEmailConfirmationConfig'
 )
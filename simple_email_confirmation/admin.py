@@ -1,10 +1,157 @@
 from django.contrib import admin
+from django.contrib.admin.actions import (
+    delete_selected as django_delete_selected,
+)
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
 
+from . import cache as confirmation_cache
 from .models import EmailAddress
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting the rows of an unfiltered queryset with the table
+    statistics of the database (PostgreSQL and MySQL), as counting millions
+    of rows takes seconds. Small or filtered querysets are counted exactly.
+    """
+
+    # below this estimate, counting exactly is cheap enough
+    exact_count_below = 10000
+
+    def _get_count(self):
+        if getattr(self, '_count', None) is None:
+            estimate = None
+            if not self.object_list.query.where:
+                estimate = self._estimate_count()
+            if estimate is None or estimate < self.exact_count_below:
+                self._count = self.object_list.count()
+            else:
+                self._count = estimate
+        return self._count
+    count = property(_get_count)
+
+    def _estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+        elif connection.vendor == 'mysql':
+            sql = (
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s'
+            )
+        else:
+            return None
+        cursor = connection.cursor()
+        cursor.execute(sql, [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+
+
+class ConfirmationStatusListFilter(admin.SimpleListFilter):
+    title = _('confirmation status')
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('confirmed', _('Confirmed')),
+            ('unconfirmed', _('Unconfirmed')),
+            ('being_confirmed', _('Being confirmed')),
+            ('expired', _('Unconfirmed and expired')),
+        )
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'confirmed':
+            return queryset.confirmed()
+        if value == 'unconfirmed':
+            return queryset.unconfirmed()
+        if value == 'being_confirmed':
+            return queryset.unconfirmed().being_confirmed()
+        if value == 'expired':
+            return queryset.unconfirmed().expired()
+        return queryset
+
+
 class EmailAddressAdmin(admin.ModelAdmin):
-    list_display = ('user', 'email', 'key', 'set_at', 'confirmed_at')
-    search_fields = ('email', 'key')
+    list_display = ('user', 'email', 'set_at', 'confirmed_at')
+    # keys are only given to their owners; new addresses get one generated
+    exclude = ('key',)
+    list_filter = (ConfirmationStatusListFilter,)
+    list_select_related = ('user',)
+    search_fields = ('email',)
+    paginator = EstimatedCountPaginator
+    # django 1.8+: don't count the whole table next to search results
+    show_full_result_count = False
+    actions = [
+        'delete_selected', 'confirm', 'reset_confirmation', 'purge_expired',
+    ]
+
+    # 'prefix' matches emails starting with the search term, 'exact' only
+    # the email itself. Both go through the index on normalized_email, and
+    # match confirmation keys exactly.
+    search_mode = 'prefix'
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        manager = EmailAddress._default_manager
+        email = manager.normalize_email(search_term)
+        if self.search_mode == 'exact':
+            condition = Q(normalized_email=email)
+        else:
+            condition = Q(normalized_email__startswith=email)
+        condition |= Q(key_digest=manager.hash_key(search_term))
+        return queryset.filter(condition), False
+
+    def delete_selected(self, request, queryset):
+        user_pks = set(queryset.values_list('user_id', flat=True))
+        response = django_delete_selected(self, request, queryset)
+        if response is None:
+            # deleted, rather than asking for confirmation
+            confirmation_cache.invalidate(user_pks, using=queryset.db)
+        return response
+    delete_selected.short_description = (
+        django_delete_selected.short_description
+    )
+
+    # the actions below are set-based UPDATEs and DELETEs, so they don't
+    # send signals
+
+    def confirm(self, request, queryset):
+        unconfirmed = queryset.unconfirmed()
+        user_pks = set(unconfirmed.values_list('user_id', flat=True))
+        count = unconfirmed.update(confirmed_at=timezone.now())
+        confirmation_cache.invalidate(user_pks, using=queryset.db)
+        self.message_user(request, _('Confirmed %d email addresses.') % count)
+    confirm.short_description = _('Confirm selected email addresses')
+
+    def reset_confirmation(self, request, queryset):
+        count = EmailAddress._default_manager.db_manager(
+            queryset.db,
+        ).reset_confirmations(queryset.values_list('pk', flat=True))
+        self.message_user(request, _(
+            'Reset the confirmation of %d email addresses.'
+        ) % count)
+    reset_confirmation.short_description = _(
+        'Reset confirmation of selected email addresses'
+    )
+
+    def purge_expired(self, request, queryset):
+        expired = queryset.unconfirmed().expired()
+        count = expired.count()
+        expired.delete()
+        self.message_user(
+            request, _('Deleted %d expired email addresses.') % count,
+        )
+    purge_expired.short_description = _(
+        'Delete selected email addresses that expired unconfirmed'
+    )
+
 
 admin.site.register((EmailAddress,), EmailAddressAdmin)
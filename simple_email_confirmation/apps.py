@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+
+
+class SimpleEmailConfirmationConfig(AppConfig):
+    name = 'simple_email_confirmation'
+    verbose_name = 'Simple Email Confirmation'
+
+    def ready(self):
+        from .models import auto_add
+
+        if getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_AUTO_ADD', True):
+            post_save.connect(
+                auto_add, sender=get_user_model(),
+                dispatch_uid='simple_email_confirmation.auto_add',
+            )
@@ -0,0 +1,102 @@
+"""
+Caching which email addresses of a User are confirmed, so checking
+`user.is_confirmed` on every request doesn't cost a query.
+
+Off by default: set settings.SIMPLE_EMAIL_CONFIRMATION_CACHE to the alias of
+one of your CACHES to enable it. Each User's entry is keyed by a version
+number, which writes to their EmailAddresses bump. Readers that fetched
+the old version can then only store their results where nobody looks.
+"""
+from __future__ import unicode_literals
+
+import random
+
+from django.conf import settings
+
+try:
+    from django.core.cache import caches
+except ImportError:
+    # django < 1.7
+    from django.core.cache import get_cache
+else:
+    def get_cache(alias):
+        return caches[alias]
+
+from .dispatch import on_commit
+from .instrumentation import Counters
+
+
+KEY_PREFIX = 'simple_email_confirmation'
+
+
+# counters about the confirmation cache, for monitoring
+stats = Counters('hits', 'misses', 'invalidations')
+
+
+def _get_alias():
+    return getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_CACHE', None)
+
+
+def is_enabled():
+    return _get_alias() is not None
+
+
+def get_stats():
+    "Dict of hit, miss and invalidation counters"
+    return stats.as_dict()
+
+
+def _version_key(user_pk):
+    return '{}:version:{}'.format(KEY_PREFIX, user_pk)
+
+
+def _get_version(cache, user_pk):
+    version = cache.get(_version_key(user_pk))
+    if version is None:
+        # start from a random version, in case an older one was evicted
+        # while entries under it are still around
+        cache.add(_version_key(user_pk), random.randint(0, 2 ** 30), None)
+        version = cache.get(_version_key(user_pk))
+    return version
+
+
+def get_confirmed(user_pk, load):
+    """
+    The User's confirmed addresses as a list of (normalized email, email,
+    confirmed_at), calling `load` to get them on a cache miss.
+    """
+    cache = get_cache(_get_alias())
+    version = _get_version(cache, user_pk)
+    key = '{}:confirmed:{}:{}'.format(KEY_PREFIX, user_pk, version)
+    confirmed = cache.get(key)
+    if confirmed is not None:
+        stats.increment('hits')
+        return confirmed
+    stats.increment('misses')
+    confirmed = load()
+    cache.set(key, confirmed)
+    return confirmed
+
+
+def _bump_versions(user_pks):
+    cache = get_cache(_get_alias())
+    for user_pk in user_pks:
+        try:
+            cache.incr(_version_key(user_pk))
+        except ValueError:
+            # no version yet, so nothing was cached
+            pass
+
+
+def invalidate(user_pks, using='default'):
+    """
+    Forget what's cached about the Users with the given pks. This happens
+    again once the current transaction on `using` commits, if we can tell
+    when, in case something was cached from the database in the meantime.
+    """
+    if not is_enabled():
+        return
+    user_pks = set(user_pks)
+    stats.increment('invalidations')
+    _bump_versions(user_pks)
+    on_commit(lambda: _bump_versions(user_pks), using)
@@ -0,0 +1,161 @@
+"""
+Sending the app's signals in the background, after the transaction that
+caused them commits.
+
+Off by default: set settings.SIMPLE_EMAIL_CONFIRMATION_ASYNC_SIGNALS to True
+to enable it. Signals are then sent by an executor: an object with a
+`submit(fn, *args, **kwargs)` method, like concurrent.futures executors.
+settings.SIMPLE_EMAIL_CONFIRMATION_SIGNAL_EXECUTOR may be the dotted path
+of a callable returning one, for instance to hand signals to a task queue;
+by default it's a ThreadPoolExecutor.
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils.six.moves import queue
+
+try:
+    from importlib import import_module
+except ImportError:
+    # python 2.6
+    from django.utils.importlib import import_module
+
+from . import signals
+from .instrumentation import Counters
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadPoolExecutor(object):
+    """
+    Runs submitted calls in daemon threads. At most `queue_size` calls wait
+    to be run: past that, submit() raises queue.Full.
+    """
+
+    def __init__(self, max_workers=2, queue_size=None):
+        if queue_size is None:
+            queue_size = getattr(
+                settings, 'SIMPLE_EMAIL_CONFIRMATION_SIGNAL_QUEUE_SIZE', 1000,
+            )
+        self.max_workers = max_workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        self.queue.put_nowait((fn, args, kwargs))
+        stats.maximum('max_queue_size', self.queue.qsize())
+        if len(self.threads) < self.max_workers:
+            self._start_worker()
+
+    def _start_worker(self):
+        with self.lock:
+            if len(self.threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            fn, args, kwargs = self.queue.get()
+            # like a request, don't hold on to database connections
+            close_old_connections()
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                logger.exception('Error sending signal in the background')
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        "Wait until every submitted call has run"
+        self.queue.join()
+
+
+# counters about signals sent in the background, for monitoring. 'failed'
+# counts receivers that raised, 'rejected' signals sent inline because the
+# executor's queue was full.
+stats = Counters('submitted', 'sent', 'failed', 'rejected', 'max_queue_size')
+
+_executors = {}
+
+
+def get_executor():
+    "The executor signals are sent with, created on first use"
+    path = getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_SIGNAL_EXECUTOR', None)
+    try:
+        return _executors[path]
+    except KeyError:
+        if path is None:
+            factory = ThreadPoolExecutor
+        else:
+            module_name, name = path.rsplit('.', 1)
+            factory = getattr(import_module(module_name), name)
+        return _executors.setdefault(path, factory())
+
+
+def get_stats():
+    """
+    Dict of counters about signals sent in the background, with the
+    current queue_size if the executor has a queue.
+    """
+    result = stats.as_dict()
+    executor = get_executor()
+    if hasattr(executor, 'queue'):
+        result['queue_size'] = executor.queue.qsize()
+    return result
+
+
+def send_signal(name, sender, kwargs):
+    """
+    Send one of the signals in simple_email_confirmation.signals, by name.
+    This is what executors call, so it can be handed to a task queue.
+    """
+    signal = getattr(signals, name)
+    for receiver, response in signal.send_robust(sender=sender, **kwargs):
+        if isinstance(response, Exception):
+            stats.increment('failed')
+            logger.error(
+                'Error in %s receiver %r', name, receiver,
+                exc_info=(type(response), response, None),
+            )
+    stats.increment('sent')
+
+
+def on_commit(func, using):
+    "Call func once the current transaction commits, if we can tell when"
+    if hasattr(transaction, 'on_commit'):
+        transaction.on_commit(func, using=using)
+    elif hasattr(connections[using], 'on_commit'):
+        # django-transaction-hooks
+        connections[using].on_commit(func)
+    else:
+        func()
+
+
+def _submit(name, sender, kwargs):
+    stats.increment('submitted')
+    try:
+        get_executor().submit(send_signal, name, sender, kwargs)
+    except queue.Full:
+        # backpressure: the caller sends it instead of queueing it
+        stats.increment('rejected')
+        getattr(signals, name).send(sender=sender, **kwargs)
+
+
+def dispatch(name, sender, using='default', **kwargs):
+    """
+    Send the signal called `name` now, or in the background once the
+    current transaction on `using` commits if async signals are enabled.
+    """
+    if not getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_ASYNC_SIGNALS', False):
+        getattr(signals, name).send(sender=sender, **kwargs)
+        return
+    on_commit(lambda: _submit(name, sender, kwargs), using)
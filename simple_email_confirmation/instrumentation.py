@@ -0,0 +1,264 @@
+"""
+Counters and timings of the app's operations.
+
+Off by default: set settings.SIMPLE_EMAIL_CONFIRMATION_METRICS_SINK to the
+dotted path of a callable returning a sink, e.g.
+'simple_email_confirmation.instrumentation.LoggingSink'. A sink is an object
+with two methods:
+
+    increment(name, value=1)
+    timing(name, seconds)
+
+For each call of an instrumented operation, the sink gets:
+
+    timing('simple_email_confirmation.<operation>', seconds)
+    increment('simple_email_confirmation.<operation>.<outcome>')
+    increment('simple_email_confirmation.<operation>.queries', queries)
+
+The outcome is 'ok', 'expired' (EmailConfirmationExpired was raised),
+'unknown' (DoesNotExist was raised) or 'error' (anything else was raised),
+for successful confirm() and confirm_token() calls 'confirmed' or
+'already_confirmed', and for refused request_confirmation() calls
+'throttled'.
+
+Counting queries makes django log them for the duration of the operation,
+like it does when DEBUG is on.
+"""
+from __future__ import unicode_literals
+
+from collections import defaultdict
+from functools import wraps
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.db import connections
+
+try:
+    from importlib import import_module
+except ImportError:
+    # python 2.6
+    from django.utils.importlib import import_module
+
+from .exceptions import EmailConfirmationExpired
+
+
+PREFIX = 'simple_email_confirmation'
+
+logger = logging.getLogger(__name__)
+
+
+class LoggingSink(object):
+    "Logs every metric at INFO level"
+
+    def __init__(self, logger=logger):
+        self.logger = logger
+
+    def increment(self, name, value=1):
+        self.logger.info('%s +%s', name, value)
+
+    def timing(self, name, seconds):
+        self.logger.info('%s %.6fs', name, seconds)
+
+
+class StatsdSink(object):
+    """
+    Sends metrics to a statsd-style client, with incr(name, count) and
+    timing(name, milliseconds) methods. Defaults to a statsd.StatsClient.
+    """
+
+    def __init__(self, client=None):
+        if client is None:
+            try:
+                import statsd
+            except ImportError:
+                raise ImproperlyConfigured(
+                    'StatsdSink needs the statsd package, or a client'
+                )
+            client = statsd.StatsClient()
+        self.client = client
+
+    def increment(self, name, value=1):
+        self.client.incr(name, value)
+
+    def timing(self, name, seconds):
+        self.client.timing(name, seconds * 1000)
+
+
+class Counters(object):
+    """
+    Counters by name, safe to update from several threads. The given
+    `names` start at zero, others on their first increment.
+    """
+
+    def __init__(self, *names):
+        self.lock = threading.Lock()
+        self.names = names
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.values = dict.fromkeys(self.names, 0)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def maximum(self, name, value):
+        "Raise the counter to `value` if it's lower"
+        with self.lock:
+            self.values[name] = max(self.values.get(name, 0), value)
+
+    def as_dict(self):
+        with self.lock:
+            return dict(self.values)
+
+
+class MemorySink(object):
+    """
+    Keeps counters and timing summaries in memory, for exporting them
+    yourself, e.g. to Prometheus with render().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counters()
+        # name: [count, sum, max]
+        self.timings = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def increment(self, name, value=1):
+        self.counters.increment(name, value)
+
+    def timing(self, name, seconds):
+        with self.lock:
+            timing = self.timings[name]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def render(self):
+        "The metrics in the Prometheus text format"
+        lines = []
+        for name, value in sorted(self.counters.as_dict().items()):
+            lines.append('{} {}'.format(_metric_name(name), value))
+        with self.lock:
+            for name, (count, total, slowest) in sorted(self.timings.items()):
+                name = _metric_name(name) + '_seconds'
+                lines.append('{}_count {}'.format(name, count))
+                lines.append('{}_sum {:.6f}'.format(name, total))
+                lines.append('{}_max {:.6f}'.format(name, slowest))
+        return '\n'.join(lines) + '\n'
+
+
+def _metric_name(name):
+    return name.replace('.', '_')
+
+
+_sinks = {}
+
+
+def get_sink():
+    "The configured sink, created on first use, or None"
+    path = getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_METRICS_SINK', None)
+    if path is None:
+        return None
+    try:
+        return _sinks[path]
+    except KeyError:
+        module_name, name = path.rsplit('.', 1)
+        factory = getattr(import_module(module_name), name)
+        return _sinks.setdefault(path, factory())
+
+
+_local = threading.local()
+
+
+def _get_queries(connection):
+    if hasattr(connection, 'queries_log'):
+        # django 1.8+
+        return connection.queries_log
+    return connection.queries
+
+
+def _queries_logged(connection):
+    "Whether django logs the connection's queries anyway"
+    if hasattr(connection, 'queries_logged'):
+        # django 1.7+
+        return connection.queries_logged
+    return connection.use_debug_cursor or (
+        connection.use_debug_cursor is None and settings.DEBUG
+    )
+
+
+class Operation(object):
+    "Measures one call of an instrumented operation"
+
+    def __init__(self, sink, name, using):
+        self.sink = sink
+        self.name = name
+        self.connection = connections[using]
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        # count queries the way django.test.utils.CaptureQueriesContext does
+        self.queries_logged = _queries_logged(self.connection)
+        self.use_debug_cursor = self.connection.use_debug_cursor
+        self.connection.use_debug_cursor = True
+        self.initial_queries = len(_get_queries(self.connection))
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.time() - self.start
+        queries = _get_queries(self.connection)
+        num_queries = len(queries) - self.initial_queries
+        self.connection.use_debug_cursor = self.use_debug_cursor
+        if not self.queries_logged:
+            # don't let them pile up outside of requests
+            while len(queries) > self.initial_queries:
+                queries.pop()
+
+        if exc_type is not None and self.outcome == 'ok':
+            if issubclass(exc_type, EmailConfirmationExpired):
+                self.outcome = 'expired'
+            elif issubclass(exc_type, ObjectDoesNotExist):
+                self.outcome = 'unknown'
+            else:
+                self.outcome = 'error'
+        name = '{}.{}'.format(PREFIX, self.name)
+        self.sink.timing(name, seconds)
+        self.sink.increment('{}.{}'.format(name, self.outcome))
+        self.sink.increment('{}.queries'.format(name), num_queries)
+
+
+def set_outcome(outcome):
+    "Set the outcome of the innermost instrumented operation running"
+    stack = getattr(_local, 'operations', None)
+    if stack:
+        stack[-1].outcome = outcome
+
+
+def instrumented(name):
+    """
+    Decorator measuring calls of a method of a manager, model or User, on
+    the database they use.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            sink = get_sink()
+            if sink is None:
+                return method(self, *args, **kwargs)
+            using = getattr(self, 'db', None) or self._state.db or 'default'
+            operation = Operation(sink, name, using)
+            stack = _local.__dict__.setdefault('operations', [])
+            stack.append(operation)
+            try:
+                with operation:
+                    return method(self, *args, **kwargs)
+            finally:
+                stack.pop()
+        return wrapper
+    return decorator
@@ -0,0 +1,184 @@
+import csv
+from datetime import datetime
+import io
+import json
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import six, timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ...models import EmailAddress, _get_expires_at
+
+
+COLUMNS = (
+    'id', 'user_id', 'email', 'is_confirmed', 'confirmed_at', 'set_at',
+    'requested_at', 'expires_at',
+)
+
+STATUSES = ('confirmed', 'unconfirmed', 'being_confirmed', 'expired')
+
+
+class Command(BaseCommand):
+    help = (
+        'Write every email address and its confirmation state as CSV or '
+        'JSON Lines, in constant memory.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--format', choices=('csv', 'jsonl'), dest='format',
+            default='csv', help='csv or jsonl. Default: csv.',
+        ),
+        make_option(
+            '--output', dest='output', default=None,
+            help='File to write to. Default: standard output.',
+        ),
+        make_option(
+            '--status', choices=STATUSES, dest='status', default=None,
+            help='Only export confirmed, unconfirmed, being_confirmed or '
+                 'expired (unconfirmed) addresses.',
+        ),
+        make_option(
+            '--updated-since', dest='updated_since', default=None,
+            help='Only export addresses whose key was set, or that were '
+                 'confirmed or requested, since this ISO date or datetime.',
+        ),
+        make_option(
+            '--chunk-size', type='int', dest='chunk_size', default=2000,
+            help='Number of addresses to fetch per query. Default: 2000.',
+        ),
+        make_option(
+            '--database', dest='database', default=DEFAULT_DB_ALIAS,
+            help='Database to export from. Default: "default".',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        queryset = self.get_queryset(options)
+        chunk_size = options.get('chunk_size') or 2000
+        fmt = options.get('format') or 'csv'
+
+        output = options.get('output')
+        if output:
+            # newline='' lets the csv module choose line endings
+            stream = io.open(output, 'w', encoding='utf-8', newline='')
+            write = stream.write
+        else:
+            stream = None
+
+            def write(text):
+                self.stdout.write(text, ending='')
+
+        count = 0
+        try:
+            if fmt == 'csv':
+                write(format_csv([COLUMNS]))
+            for rows in iterate_rows(queryset, chunk_size):
+                rows = [self.get_values(row) for row in rows]
+                if fmt == 'csv':
+                    write(format_csv(rows))
+                else:
+                    # json.dumps() returns bytes on python 2
+                    write(''.join(six.text_type(
+                        json.dumps(dict(zip(COLUMNS, row)), sort_keys=True),
+                    ) + '\n' for row in rows))
+                count += len(rows)
+        finally:
+            if stream is not None:
+                stream.close()
+
+        if output and int(options.get('verbosity', 1)) >= 1:
+            self.stdout.write('Exported {0} email addresses'.format(count))
+
+    def get_queryset(self, options):
+        queryset = EmailAddress.objects.using(options.get('database'))
+
+        status = options.get('status')
+        if status == 'confirmed':
+            queryset = queryset.confirmed()
+        elif status == 'unconfirmed':
+            queryset = queryset.unconfirmed()
+        elif status == 'being_confirmed':
+            queryset = queryset.unconfirmed().being_confirmed()
+        elif status == 'expired':
+            queryset = queryset.unconfirmed().expired()
+
+        since = options.get('updated_since')
+        if since:
+            since = parse_since(since)
+            queryset = queryset.filter(
+                Q(set_at__gte=since) | Q(confirmed_at__gte=since) |
+                Q(requested_at__gte=since)
+            )
+        return queryset
+
+    def get_values(self, row):
+        "Values of COLUMNS for a row of iterate_rows()"
+        pk, user_id, email, set_at, confirmed_at, requested_at = row
+        expires_at = _get_expires_at(set_at)
+        return [
+            pk, user_id, email, confirmed_at is not None,
+            format_datetime(confirmed_at), format_datetime(set_at),
+            format_datetime(requested_at), format_datetime(expires_at),
+        ]
+
+
+def iterate_rows(queryset, chunk_size):
+    """
+    Yield lists of tuples from the queryset, `chunk_size` at a time, in pk
+    order. Each list is a separate query starting after the last pk seen,
+    so no backend holds more than one chunk in memory - on django < 1.11,
+    iterator() reads whole results into memory on PostgreSQL.
+    """
+    queryset = queryset.order_by('pk').values_list(
+        'pk', 'user_id', 'email', 'set_at', 'confirmed_at', 'requested_at',
+    )
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            break
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def format_csv(rows):
+    "Rows as CSV text"
+    if six.PY2:
+        # python 2's csv module only handles byte strings
+        buffer = io.BytesIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                '' if value is None else six.text_type(value).encode('utf-8')
+                for value in row
+            ])
+        return buffer.getvalue().decode('utf-8')
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def format_datetime(value):
+    return value.isoformat() if value is not None else None
+
+
+def parse_since(value):
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            since = date and datetime(date.year, date.month, date.day)
+    except ValueError:
+        since = None
+    if since is None:
+        raise CommandError('--updated-since must be an ISO date or datetime')
+    if settings.USE_TZ and timezone.is_naive(since):
+        since = timezone.make_aware(since, timezone.get_current_timezone())
+    return since
@@ -0,0 +1,53 @@
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import EmailAddress, _get_confirmation_period
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete, or with --reset re-key, unconfirmed email addresses whose '
+        'confirmation key expired.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--reset', action='store_true', dest='reset', default=False,
+            help='Reset the confirmation instead of deleting the address.',
+        ),
+        make_option(
+            '--older-than', type='int', dest='older_than', default=None,
+            help='Treat keys set more than this many days ago as expired, '
+                 'instead of using SIMPLE_EMAIL_CONFIRMATION_PERIOD.',
+        ),
+        make_option(
+            '--batch-size', type='int', dest='batch_size', default=1000,
+            help='Number of addresses to handle per query. Default: 1000.',
+        ),
+        make_option(
+            '--sleep', type='float', dest='sleep', default=0,
+            help='Seconds to sleep between batches. Default: 0.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        older_than = options.get('older_than')
+        if older_than is not None:
+            older_than = timedelta(days=older_than)
+        elif _get_confirmation_period() is None:
+            raise CommandError(
+                'Set SIMPLE_EMAIL_CONFIRMATION_PERIOD or use --older-than'
+            )
+
+        if options.get('reset'):
+            method, verb = EmailAddress.objects.reset_expired, 'Reset'
+        else:
+            method, verb = EmailAddress.objects.delete_expired, 'Deleted'
+        count = method(
+            older_than=older_than,
+            batch_size=options.get('batch_size', 1000),
+            sleep=options.get('sleep', 0),
+        )
+        if int(options.get('verbosity', 1)) >= 1:
+            self.stdout.write('{0} {1} email addresses'.format(verb, count))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.conf import settings
+from django.db import models, migrations
+
+
+def hash_keys(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    store_keys = getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_STORE_KEYS', True)
+    unhashed = EmailAddress.objects.filter(key_digest__isnull=True)
+    while True:
+        rows = list(unhashed.values_list('pk', 'key')[:1000])
+        if not rows:
+            break
+        for pk, key in rows:
+            EmailAddress.objects.filter(pk=pk).update(
+                key=key if store_keys else None,
+                key_digest=hashlib.sha256(key.encode('utf-8')).hexdigest(),
+            )
+
+
+def unhash_keys(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    if EmailAddress.objects.filter(key__isnull=True).exists():
+        raise RuntimeError(
+            'Plaintext confirmation keys are gone, cannot migrate backwards'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_email_confirmation', '0002_emailaddress_requested_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailaddress',
+            name='key_digest',
+            field=models.CharField(max_length=64, null=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='key',
+            field=models.CharField(max_length=40, null=True, blank=True),
+        ),
+        migrations.RunPython(hash_keys, unhash_keys),
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='key_digest',
+            field=models.CharField(unique=True, max_length=64, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import simple_email_confirmation.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_email_confirmation', '0003_emailaddress_key_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='key',
+            field=models.CharField(default=simple_email_confirmation.models._generate_key, max_length=40, null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+from ._indexes import (
+    create_unconfirmed_set_at_index, drop_unconfirmed_set_at_index,
+)
+
+
+def create_index(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    create_unconfirmed_set_at_index(schema_editor, EmailAddress._meta.db_table)
+
+
+def drop_index(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    drop_unconfirmed_set_at_index(schema_editor, EmailAddress._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_email_confirmation', '0004_emailaddress_key_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='email',
+            field=models.EmailField(max_length=255, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='requested_at',
+            field=models.DateTimeField(help_text='Last time confirmation was requested for this email', null=True, db_index=True, blank=True),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
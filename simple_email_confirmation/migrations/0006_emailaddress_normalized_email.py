@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count
+
+from ._indexes import recreate_unconfirmed_set_at_index
+
+
+def normalize_email(email):
+    local_part, at, domain = (email or '').strip().rpartition('@')
+    if at:
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return (local_part + at + domain).lower()
+
+
+def normalize_emails(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    # walk the rows by pk: some emails normalize to ''
+    rows = EmailAddress.objects.order_by('pk').values_list('pk', 'email')
+    last_pk = None
+    while True:
+        chunk = rows
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:1000])
+        if not chunk:
+            break
+        for pk, email in chunk:
+            EmailAddress.objects.filter(pk=pk).update(
+                normalized_email=normalize_email(email),
+            )
+        last_pk = chunk[-1][0]
+
+    duplicates = list(
+        EmailAddress.objects.values('user', 'normalized_email')
+        .annotate(count=Count('pk')).filter(count__gt=1)[:10]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Some users have email addresses differing only in case, remove '
+            'all but one of each before migrating: {}'.format(', '.join(
+                '{user} <{normalized_email}>'.format(**duplicate)
+                for duplicate in duplicates
+            ))
+        )
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+def recreate_index(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    recreate_unconfirmed_set_at_index(
+        schema_editor, EmailAddress._meta.db_table,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_email_confirmation', '0005_add_indexes'),
+    ]
+
+    # sqlite drops indexes it doesn't know about when rebuilding tables, in
+    # both directions
+    operations = [
+        migrations.RunPython(noop, recreate_index),
+        migrations.AddField(
+            model_name='emailaddress',
+            name='normalized_email',
+            field=models.CharField(default='', max_length=255, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalize_emails, noop),
+        migrations.AlterUniqueTogether(
+            name='emailaddress',
+            unique_together=set([('user', 'normalized_email')]),
+        ),
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='email',
+            field=models.EmailField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='emailaddress',
+            name='normalized_email',
+            field=models.CharField(max_length=255, editable=False, db_index=True),
+        ),
+        migrations.RunPython(recreate_index, noop),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+from ._indexes import recreate_unconfirmed_set_at_index
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+def recreate_index(apps, schema_editor):
+    EmailAddress = apps.get_model('simple_email_confirmation', 'EmailAddress')
+    recreate_unconfirmed_set_at_index(
+        schema_editor, EmailAddress._meta.db_table,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simple_email_confirmation', '0006_emailaddress_normalized_email'),
+    ]
+
+    # sqlite drops indexes it doesn't know about when rebuilding tables, in
+    # both directions
+    operations = [
+        migrations.RunPython(noop, recreate_index),
+        migrations.AddField(
+            model_name='emailaddress',
+            name='request_count',
+            field=models.PositiveIntegerField(default=0, help_text='Confirmation requests since request_window_started_at'),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='emailaddress',
+            name='request_window_started_at',
+            field=models.DateTimeField(help_text='When the current window of confirmation requests began', null=True, blank=True),
+            preserve_default=True,
+        ),
+        migrations.RunPython(recreate_index, noop),
+    ]
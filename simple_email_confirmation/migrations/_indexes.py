@@ -0,0 +1,55 @@
+"""
+Index on unconfirmed EmailAddresses by set_at, for finding expired
+confirmations. It's partial where the backend supports it, which django's
+schema editor doesn't know about - so it's managed with raw SQL, and has to
+be recreated after sqlite rebuilds the table.
+"""
+
+UNCONFIRMED_SET_AT_INDEX = (
+    'simple_email_confirmation_emailaddress_unconfirmed_set_at'
+)
+
+
+def supports_partial_indexes(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 8, 0)
+    return False
+
+
+def create_unconfirmed_set_at_index(schema_editor, table):
+    qn = schema_editor.quote_name
+    if supports_partial_indexes(schema_editor.connection):
+        sql = 'CREATE INDEX {0} ON {1} ({2}) WHERE {3} IS NULL'
+    else:
+        sql = 'CREATE INDEX {0} ON {1} ({3}, {2})'
+    schema_editor.execute(sql.format(
+        qn(UNCONFIRMED_SET_AT_INDEX), qn(table), qn('set_at'),
+        qn('confirmed_at'),
+    ))
+
+
+def drop_unconfirmed_set_at_index(schema_editor, table):
+    if schema_editor.connection.vendor == 'mysql':
+        sql = 'DROP INDEX {0} ON {1}'
+    else:
+        sql = 'DROP INDEX {0}'
+    schema_editor.execute(sql.format(
+        schema_editor.quote_name(UNCONFIRMED_SET_AT_INDEX),
+        schema_editor.quote_name(table),
+    ))
+
+
+def recreate_unconfirmed_set_at_index(schema_editor, table):
+    "Recreate the index if sqlite dropped it while rebuilding the table"
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = %s",
+        [UNCONFIRMED_SET_AT_INDEX],
+    )
+    if cursor.fetchone() is None:
+        create_unconfirmed_set_at_index(schema_editor, table)
@@ -1,20 +1,173 @@
 from __future__ import unicode_literals
 
+import base64
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from functools import wraps
+import hashlib
+import os
+import time
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models.signals import post_init, post_save
-from django.dispatch import receiver
-from django.utils.crypto import get_random_string
+from django.core import signing
+from django.db import (
+    IntegrityError, connections, models, router, transaction,
+)
+from django.db.models.query import QuerySet
+from django.db.models.sql import DeleteQuery
+from django.db.models.signals import post_save
+from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+try:
+    from importlib import import_module
+except ImportError:
+    # python 2.6
+    from django.utils.importlib import import_module
+
+try:
+    from django.db.models.sql.constants import CURSOR
+except ImportError:
+    # django < 1.7 returns the cursor when given no result type
+    CURSOR = None
+
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    # django < 1.8
+    from django.test.signals import setting_changed
+
+from . import cache as confirmation_cache, instrumentation, signals
+from .dispatch import dispatch
 from .exceptions import (
     EmailConfirmationExpired, EmailIsPrimary, EmailNotConfirmed,
 )
-from .signals import (
-    email_confirmed, unconfirmed_email_created, primary_email_changed,
-)
+from .instrumentation import instrumented
+from .signals import primary_email_changed
+
+
+TOKEN_SALT = 'simple_email_confirmation.token'
+
+# 160 bits of randomness per key, base32-encoded to 32 alphanumeric chars
+KEY_BYTES = 20
+KEY_LENGTH = KEY_BYTES * 8 // 5
+
+# how many keys a custom key generator gets to produce an unused one
+KEY_ATTEMPTS = 3
+
+EmailConfirmationStatus = namedtuple('EmailConfirmationStatus', [
+    'is_confirmed', 'confirmed_at', 'has_active_confirmation_request',
+])
+
+
+def _get_primary_email(user):
+    # softly fail for User models not using SimpleEmailConfirmationUserMixin
+    if hasattr(user, 'get_primary_email'):
+        return user.get_primary_email()
+    return user.email
+
+
+_settings_cache = {}
+
+
+def _get_setting(name, default):
+    "settings.SIMPLE_EMAIL_CONFIRMATION_<name>, read once per process"
+    try:
+        return _settings_cache[name]
+    except KeyError:
+        return _settings_cache.setdefault(name, getattr(
+            settings, 'SIMPLE_EMAIL_CONFIRMATION_' + name, default,
+        ))
+
+
+def clear_settings_cache(sender, **kwargs):
+    "Read the settings again when they're changed, e.g. by tests"
+    if kwargs['setting'].startswith('SIMPLE_EMAIL_CONFIRMATION_'):
+        _settings_cache.clear()
+
+
+setting_changed.connect(clear_settings_cache)
+
+
+def _get_confirmation_period():
+    # By default, keys don't expire. If you want them to, set
+    # settings.SIMPLE_EMAIL_CONFIRMATION_PERIOD to a timedelta.
+    return _get_setting('PERIOD', None)
+
+
+def _get_expires_at(set_at):
+    "When a key whose expiration was set at `set_at` expires, or None"
+    period = _get_confirmation_period()
+    return set_at + period if period is not None else None
+
+
+def _as_stored(value, using):
+    "A datetime at the precision the database `using` stores it with"
+    if connections[using].features.supports_microsecond_precision:
+        return value
+    # e.g. MySQL < 5.6.4 with django < 1.8
+    return value.replace(microsecond=0)
+
+
+def _is_expired(set_at):
+    "Has a confirmation key whose expiration was set at `set_at` expired?"
+    expires_at = _get_expires_at(set_at)
+    return expires_at is not None and timezone.now() >= expires_at
+
+
+def _get_request_throttle():
+    # By default, confirmation requests aren't throttled. Set
+    # settings.SIMPLE_EMAIL_CONFIRMATION_REQUEST_INTERVAL to the timedelta
+    # that must pass between two requests, and/or
+    # settings.SIMPLE_EMAIL_CONFIRMATION_REQUEST_LIMIT to a (count, timedelta)
+    # pair to allow at most `count` requests per window of that length.
+    return (
+        _get_setting('REQUEST_INTERVAL', None),
+        _get_setting('REQUEST_LIMIT', None),
+    )
+
+
+def _get_key_generator():
+    # By default, keys are random. Set
+    # settings.SIMPLE_EMAIL_CONFIRMATION_KEY_GENERATOR to the dotted path of
+    # a callable taking no arguments and returning a new key to use your own.
+    try:
+        return _settings_cache['key_generator']
+    except KeyError:
+        path = _get_setting('KEY_GENERATOR', None)
+        generator = None
+        if path is not None:
+            module_name, name = path.rsplit('.', 1)
+            generator = getattr(import_module(module_name), name)
+        return _settings_cache.setdefault('key_generator', generator)
+
+
+def _normalize_email(email):
+    return EmailAddress._default_manager.normalize_email(email)
+
+
+def _get_read_database():
+    # By default, EmailAddresses are read from wherever the database router
+    # says. Set settings.SIMPLE_EMAIL_CONFIRMATION_READ_DATABASE to the
+    # alias of a replica to send reads that don't precede a write there.
+    return _get_setting('READ_DATABASE', None)
+
+
+def _store_keys():
+    # By default, plaintext confirmation keys are stored alongside their
+    # digest. Set settings.SIMPLE_EMAIL_CONFIRMATION_STORE_KEYS to False
+    # to only ever store the digest.
+    return _get_setting('STORE_KEYS', True)
+
+
+def _unexpired_lookups(now):
+    "Queryset filter kwargs matching EmailAddresses whose key isn't expired"
+    period = _get_confirmation_period()
+    if period is None:
+        return {}
+    return {'set_at__gt': now - period}
 
 
 class SimpleEmailConfirmationUserMixin(object):
@@ -34,27 +187,148 @@ class SimpleEmailConfirmationUserMixin(object):
     def get_primary_email(self):
         return getattr(self, self.primary_email_field_name)
 
-    def __get_or_create_primary_address(self):
-        """ Returns the EmailAddress matching the user's primary email,
-            creating it if necessary; None if primary email field is blank.
+    def __get_read_db(self):
+        return _get_read_database() or router.db_for_read(
+            EmailAddress, instance=self,
+        )
+
+    def __get_write_db(self, using=None):
+        return using or router.db_for_write(EmailAddress, instance=self)
+
+    def __get_email_addresses(self, using=None):
+        """ Returns a list of the User's EmailAddresses, loading them with a
+            single query the first time and caching them on the instance.
+            If `using` is given, they must come from that database, else
+            they're loaded from the read database.
+        """
+        if '_email_address_cache' in self.__dict__ and (
+                using is None or
+                self.__dict__.get('_email_address_cache_db') == using):
+            return self._email_address_cache
+
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get(
+            'email_address_set',
+        )
+        if prefetched is not None and (
+                using is None or prefetched.db == using):
+            addresses, db = list(prefetched), prefetched.db
+        else:
+            db = using or self.__get_read_db()
+            addresses = list(self.email_address_set.using(db))
+        self._email_address_cache = addresses
+        self._email_address_cache_db = db
+        return addresses
+
+    def __get_address(self, email, using=None):
+        "Returns the User's EmailAddress for the given email, in any case"
+        normalized_email = _normalize_email(email)
+        for address in self.__get_email_addresses(using):
+            if address.normalized_email == normalized_email:
+                return address
+        raise EmailAddress.DoesNotExist(
+            'User has no email address {}'.format(email)
+        )
+
+    def __get_or_create_primary_address(self, using):
+        """ Returns the EmailAddress matching the user's primary email from
+            the database `using`, creating it if necessary; None if primary
+            email field is blank.
         """
         email = getattr(self, self.primary_email_field_name)
         if email:
-            address, created = self.email_address_set.get_or_create(email=email)
-            return address
+            try:
+                return self.__get_address(email, using)
+            except EmailAddress.DoesNotExist:
+                # not the related manager: its get_or_create() ignores `using`
+                address, created = EmailAddress._default_manager.db_manager(
+                    using,
+                ).get_or_create(
+                    user=self, normalized_email=_normalize_email(email),
+                    defaults={'email': email},
+                )
+                self.__get_email_addresses(using).append(address)
+                return address
         return None
 
-    def set_primary_email(self, email, require_confirmed=True):
-        "Set an email address as primary"
+    def __get_confirmed(self, using=None):
+        """ Returns (normalized email, email, confirmed_at) of the User's
+            confirmed addresses, from the confirmation cache if enabled and
+            the addresses aren't loaded already. If `using` is given, they
+            must be as fresh as that database.
+        """
+        if using is None:
+            try:
+                return self._confirmed_email_cache
+            except AttributeError:
+                pass
+
+        def load(using=None):
+            return [
+                (address.normalized_email, address.email,
+                 address.confirmed_at)
+                for address in self.__get_email_addresses(using)
+                if address.is_confirmed
+            ]
+
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if (self.pk is None or not confirmation_cache.is_enabled() or
+                hasattr(self, '_email_address_cache') or
+                'email_address_set' in prefetched):
+            confirmed = load(using)
+        else:
+            # the cache is filled from the database writes go to, and
+            # invalidated by writes, so entries are as fresh as it is
+            write_db = self.__get_write_db()
+            if using in (None, write_db):
+                confirmed = confirmation_cache.get_confirmed(
+                    self.pk, lambda: load(write_db),
+                )
+            else:
+                confirmed = load(using)
+
+        if using is None:
+            self._confirmed_email_cache = confirmed
+        return confirmed
+
+    def clear_email_address_cache(self):
+        """
+        Forget the EmailAddresses cached on this User instance. Call this
+        if you modify the User's EmailAddresses without going through the
+        methods of this mixin.
+        """
+        self.__dict__.pop('_email_address_cache', None)
+        self.__dict__.pop('_email_address_cache_db', None)
+        self.__dict__.pop('_confirmed_email_cache', None)
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        prefetched.pop('email_address_set', None)
+
+    def __get_confirmed_at(self, email, using=None):
+        normalized_email = _normalize_email(email)
+        for confirmed in self.__get_confirmed(using):
+            if confirmed[0] == normalized_email:
+                return confirmed[2]
+        return None
+
+    def __is_confirmed(self, email, using=None):
+        return self.__get_confirmed_at(email, using) is not None
+
+    @instrumented('set_primary_email')
+    def set_primary_email(self, email, require_confirmed=True, using=None):
+        """
+        Set an email address as primary, checking it's confirmed on the
+        database `using`, by default the one EmailAddresses are written to
+        """
         old_email = self.get_primary_email()
         if email == old_email:
             return
 
-        if email not in self.get_confirmed_emails() and require_confirmed:
+        if require_confirmed and not self.__is_confirmed(
+                email, self.__get_write_db(using)):
             raise EmailNotConfirmed()
 
         setattr(self, self.primary_email_field_name, email)
         self.save(update_fields=[self.primary_email_field_name])
+        self.clear_email_address_cache()
         primary_email_changed.send(
             sender=self, old_email=old_email, new_email=email,
         )
@@ -62,63 +336,132 @@ class SimpleEmailConfirmationUserMixin(object):
     @property
     def is_confirmed(self):
         "Is the User's primary email address confirmed?"
-        return self.get_primary_email() in self.get_confirmed_emails()
+        return self.__is_confirmed(self.get_primary_email())
+
+    def __get_primary_address(self, using=None):
+        "Returns the EmailAddress matching the user's primary email, or None"
+        try:
+            return self.__get_address(self.get_primary_email(), using)
+        except EmailAddress.DoesNotExist:
+            return None
 
     @property
     def has_active_confirmation_request(self):
         "Is there an active confirmation request for the primary email address?"
-        address = self.__get_or_create_primary_address()
+        address = self.__get_primary_address()
         return bool(address and address.is_being_confirmed)
 
     @property
     def confirmed_at(self):
         "When the User's primary email address was confirmed, or None"
-        address = self.__get_or_create_primary_address()
-        return address and address.confirmed_at
+        return self.__get_confirmed_at(self.get_primary_email())
 
-    def get_confirmation_key(self, email=None):
-        "Get the confirmation key for an email"
+    def get_confirmation_status(self, using=None):
+        """
+        EmailConfirmationStatus of the primary email address, so callers
+        needing several of the properties above make a single call.
+        """
+        address = self.__get_primary_address(using)
+        return EmailConfirmationStatus(
+            is_confirmed=bool(address and address.is_confirmed),
+            confirmed_at=address and address.confirmed_at,
+            has_active_confirmation_request=bool(
+                address and address.is_being_confirmed
+            ),
+        )
+
+    def __get_address_or_primary(self, email=None, using=None):
+        """ Returns the EmailAddress for the given email, primary by default,
+            from the database EmailAddresses are written to
+        """
+        using = self.__get_write_db(using)
         if email:
-            address = self.email_address_set.get(email=email)
-        else:
-            address = self.__get_or_create_primary_address()
-            if not address:
-                raise EmailAddress.DoesNotExist('User has no primary email')
+            return self.__get_address(email, using)
+        address = self.__get_or_create_primary_address(using)
+        if not address:
+            raise EmailAddress.DoesNotExist('User has no primary email')
+        return address
+
+    def request_email_confirmation(self, email=None, using=None):
+        """
+        Record a confirmation request for an email, primary by default.
+        Returns whether to send the confirmation, see
+        EmailAddressManager.request_confirmation.
+        """
+        address = self.__get_address_or_primary(email, using)
+        return self.email_address_set.request_confirmation(
+            address, using=address._state.db,
+        )
+
+    def get_confirmation_key(self, email=None, using=None):
+        "Get the confirmation key for an email"
+        address = self.__get_address_or_primary(email, using)
+        if address.key is None:
+            # only the digest of the key is stored, so issue a new one
+            address.regenerate_key()
         return address.key
 
-    def get_confirmed_emails(self):
+    def get_confirmation_token(self, email=None, using=None):
+        "Get a signed confirmation token for an email"
+        return self.__get_address_or_primary(
+            email, using,
+        ).get_confirmation_token()
+
+    def get_confirmed_emails(self, using=None):
         "List of emails this User has confirmed"
-        address_qs = self.email_address_set.filter(confirmed_at__isnull=False)
-        return [address.email for address in address_qs]
+        return [confirmed[1] for confirmed in self.__get_confirmed(using)]
 
-    def get_unconfirmed_emails(self):
+    def get_unconfirmed_emails(self, using=None):
         "List of emails this User has been associated with but not confirmed"
-        # Make sure primary email is registered:
-        self.__get_or_create_primary_address()
-        address_qs = self.email_address_set.filter(confirmed_at__isnull=True)
-        return [address.email for address in address_qs]
+        emails = [
+            address.email for address in self.__get_email_addresses(using)
+            if not address.is_confirmed
+        ]
+        # the primary email counts even if it has no EmailAddress (yet)
+        primary_email = self.get_primary_email()
+        if primary_email and self.__get_primary_address(using) is None:
+            emails.insert(0, primary_email)
+        return emails
 
-    def confirm_email(self, confirmation_key, save=True):
+    def confirm_email(self, confirmation_key, save=True, using=None):
         """
         Attempt to confirm an email using the given key.
         Returns the email that was confirmed, or raise an exception.
         """
-        address = self.email_address_set.confirm(confirmation_key, save=save)
+        address = self.email_address_set.confirm(
+            confirmation_key, save=save, using=using,
+        )
+        self.clear_email_address_cache()
         return address.email
 
-    def add_confirmed_email(self, email):
+    def confirm_email_token(self, confirmation_token, save=True, using=None):
+        """
+        Attempt to confirm an email using the given signed token.
+        Returns the email that was confirmed, or raise an exception.
+        """
+        address = self.email_address_set.confirm_token(
+            confirmation_token, save=save, using=using,
+        )
+        self.clear_email_address_cache()
+        return address.email
+
+    def add_confirmed_email(self, email, using=None):
         "Adds an email to the user that's already in the confirmed state"
         # if email already exists, let exception be thrown
-        address = self.email_address_set.create_confirmed(email)
+        address = self.email_address_set.create_confirmed(email, using=using)
+        self.clear_email_address_cache()
         return address.key
 
-    def add_unconfirmed_email(self, email):
+    def add_unconfirmed_email(self, email, using=None):
         "Adds an unconfirmed email address and returns it's confirmation key"
         # if email already exists, let exception be thrown
-        address = self.email_address_set.create_unconfirmed(email)
+        address = self.email_address_set.create_unconfirmed(
+            email, using=using,
+        )
+        self.clear_email_address_cache()
         return address.key
 
-    def add_email_if_not_exists(self, email):
+    def add_email_if_not_exists(self, email, using=None):
         """
         If the user already has the email, and it's confirmed, do nothing
         and return None.
@@ -126,82 +469,866 @@ class SimpleEmailConfirmationUserMixin(object):
         If the user already has the email, and it's unconfirmed, reset the
         confirmation. If the confirmation is unexpired, do nothing. Return
         the confirmation key of the email.
+
+        The email is looked up on the database `using`, by default the one
+        EmailAddresses are written to, not the read database.
         """
         try:
-            address = self.email_address_set.get(email=email)
+            address = self.__get_address(email, self.__get_write_db(using))
         except EmailAddress.DoesNotExist:
-            key = self.add_unconfirmed_email(email)
+            key = self.add_unconfirmed_email(email, using)
         else:
             if not address.is_confirmed:
                 key = address.reset_confirmation()
+                self.clear_email_address_cache()
             else:
                 key = None
 
         return key
 
-    def reset_email_confirmation(self, email):
+    def reset_email_confirmation(self, email, using=None):
         "Reset the expiration of an email confirmation"
-        address = self.email_address_set.get(email=email)
-        return address.reset_confirmation()
+        address = self.__get_address(email, self.__get_write_db(using))
+        key = address.reset_confirmation()
+        self.clear_email_address_cache()
+        return key
 
-    def remove_email(self, email):
+    @instrumented('remove_email')
+    def remove_email(self, email, using=None):
         "Remove an email address"
         # if email already exists, let exception be thrown
-        if email == self.get_primary_email():
+        primary_email = self.get_primary_email()
+        if _normalize_email(email) == _normalize_email(primary_email):
             raise EmailIsPrimary()
-        address = self.email_address_set.get(email=email)
+        address = self.__get_address(email, self.__get_write_db(using))
         address.delete()
+        self.clear_email_address_cache()
+
+
+class SimpleEmailConfirmationUserQuerySet(QuerySet):
+    """
+    QuerySet to be used by the manager of your custom User model.
+    Provides bulk versions of the mixin's read accessors.
+    """
+
+    def prefetch_email_addresses(self):
+        """
+        Load the EmailAddresses of all Users in this queryset with one extra
+        query, so the mixin's accessors don't need to hit the database.
+        """
+        return self.prefetch_related('email_address_set')
+
+    def get_confirmation_statuses(self):
+        "Dict of EmailConfirmationStatus by User pk"
+        return EmailAddress.objects.get_confirmation_statuses(self)
+
+    def _primary_address_sql(self, select, condition=''):
+        """ SQL for a subquery on the EmailAddress matching each User's
+            primary email. Case is only folded in SQL for ASCII domains, so
+            primary emails with internationalized domains have to match the
+            address exactly.
+        """
+        qn = connections[self.db].ops.quote_name
+        user_opts = self.model._meta
+        address_opts = EmailAddress._meta
+        field_name = getattr(self.model, 'primary_email_field_name', 'email')
+        return (
+            'SELECT {select} FROM {address_table} '
+            'WHERE {address_table}.{user_column} = {user_table}.{pk_column} '
+            'AND ({address_table}.{email_column} = '
+            '{user_table}.{field_column} '
+            'OR {address_table}.{normalized_column} = '
+            'LOWER({user_table}.{field_column})){condition}'
+        ).format(
+            select=select,
+            condition=condition,
+            address_table=qn(address_opts.db_table),
+            user_column=qn(address_opts.get_field('user').column),
+            email_column=qn(address_opts.get_field('email').column),
+            normalized_column=qn(
+                address_opts.get_field('normalized_email').column
+            ),
+            user_table=qn(user_opts.db_table),
+            pk_column=qn(user_opts.pk.column),
+            field_column=qn(user_opts.get_field(field_name).column),
+        )
+
+    def _primary_confirmed_sql(self):
+        qn = connections[self.db].ops.quote_name
+        return 'EXISTS ({})'.format(self._primary_address_sql(
+            '1', ' AND {}.{} IS NOT NULL'.format(
+                qn(EmailAddress._meta.db_table),
+                qn(EmailAddress._meta.get_field('confirmed_at').column),
+            ),
+        ))
+
+    def with_email_confirmation(self):
+        """
+        Annotate each User with `primary_confirmed` (truthy if the primary
+        email is confirmed) and `primary_confirmed_at`. Both can be used in
+        order_by().
+        """
+        qn = connections[self.db].ops.quote_name
+        confirmed_at_column = '{}.{}'.format(
+            qn(EmailAddress._meta.db_table),
+            qn(EmailAddress._meta.get_field('confirmed_at').column),
+        )
+        return self.extra(select={
+            'primary_confirmed': self._primary_confirmed_sql(),
+            'primary_confirmed_at': '({})'.format(
+                self._primary_address_sql(confirmed_at_column),
+            ),
+        })
+
+    def primary_email_confirmed(self):
+        "Users whose primary email is confirmed"
+        return self.extra(where=[self._primary_confirmed_sql()])
+
+    def primary_email_unconfirmed(self):
+        "Users whose primary email is not confirmed, or who have none"
+        return self.extra(where=['NOT ' + self._primary_confirmed_sql()])
+
+
+class EmailAddressQuerySet(QuerySet):
+    """
+    QuerySet of EmailAddress.objects, with the conditions of the model's
+    properties expressed as database filters.
+    """
+
+    def confirmed(self):
+        return self.filter(confirmed_at__isnull=False)
+
+    def unconfirmed(self):
+        return self.filter(confirmed_at__isnull=True)
+
+    def expired(self):
+        "Addresses whose confirmation key expired, see is_key_expired"
+        period = _get_confirmation_period()
+        if period is None:
+            return self.none()
+        return self.filter(set_at__lte=timezone.now() - period)
+
+    def active(self):
+        "Addresses whose confirmation key hasn't expired"
+        return self.filter(**_unexpired_lookups(timezone.now()))
+
+    def being_confirmed(self):
+        "Addresses with an active confirmation request, see is_being_confirmed"
+        return self.active().filter(requested_at__isnull=False)
+
+    def annotate_expires_at(self):
+        """
+        Annotate each address with `expires_at`, when its confirmation key
+        expires (see key_expires_at). It can be used in order_by().
+        """
+        period = _get_confirmation_period()
+        if period is None:
+            return self.extra(select={'expires_at': 'NULL'})
+        connection = connections[self.db]
+        set_at_column = '{}.{}'.format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            connection.ops.quote_name(
+                self.model._meta.get_field('set_at').column,
+            ),
+        )
+        return self.extra(select={
+            'expires_at': connection.ops.date_interval_sql(
+                set_at_column, '+', period,
+            ),
+        })
+
+    def iterator(self):
+        for address in super(EmailAddressQuerySet, self).iterator():
+            expires_at = getattr(address, 'expires_at', None)
+            if expires_at is not None:
+                address.expires_at = self._to_datetime(expires_at)
+            yield address
+
+    def _to_datetime(self, value):
+        # extra() selects aren't converted like fields: sqlite returns a
+        # string, and backends without timezone support a naive datetime
+        if not isinstance(value, datetime):
+            value = parse_datetime(value)
+        if settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        return value
+
+
+def _routed(read_only=False):
+    """
+    Decorator letting a method of EmailAddressManager be called with
+    using=<alias>, to run it on that database. Otherwise methods that only
+    read run on the read database if there is one, and the others on the
+    database writes go to, so they read what they wrote.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            using = kwargs.pop('using', None)
+            if using is None and self._db is None:
+                using = (
+                    _get_read_database() if read_only else self._write_db()
+                )
+            if using is not None and using != self._db:
+                self = self.db_manager(using)
+            return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class EmailAddressManager(models.Manager):
 
+    def get_queryset(self):
+        return EmailAddressQuerySet(self.model, using=self._db)
+
+    def confirmed(self):
+        return self.get_queryset().confirmed()
+
+    def unconfirmed(self):
+        return self.get_queryset().unconfirmed()
+
+    def expired(self):
+        return self.get_queryset().expired()
+
+    def active(self):
+        return self.get_queryset().active()
+
+    def being_confirmed(self):
+        return self.get_queryset().being_confirmed()
+
+    def annotate_expires_at(self):
+        return self.get_queryset().annotate_expires_at()
+
+    def _write_db(self):
+        "The database the router sends this manager's writes to"
+        instance = getattr(self, 'instance', None)
+        if instance is None:
+            return router.db_for_write(self.model)
+        # a User's related manager
+        return router.db_for_write(self.model, instance=instance)
+
+    def _create(self, **kwargs):
+        # not self.create(): that of related managers ignores db_manager()
+        return self.model._default_manager.db_manager(self.db).create(
+            **kwargs
+        )
+
     def generate_key(self):
         "Generate a new random key and return it"
-        # double django default length for ~142 bits of randomness
-        return get_random_string(length=24)
+        return self.generate_keys(1)[0]
+
+    def hash_key(self, key):
+        "Return the digest under which a confirmation key is looked up"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
 
+    def normalize_email(self, email):
+        """
+        Return the form of an email under which it is looked up: lowercased,
+        with the domain IDNA-encoded.
+        """
+        local_part, at, domain = (email or '').strip().rpartition('@')
+        if at:
+            try:
+                domain = domain.encode('idna').decode('ascii')
+            except UnicodeError:
+                pass
+        return (local_part + at + domain).lower()
+
+    def filter_email(self, email):
+        "Filter on an email, in any case"
+        return self.filter(normalized_email=self.normalize_email(email))
+
+    @_routed()
+    @instrumented('create_confirmed')
     def create_confirmed(self, email, user=None):
         "Create an email address in the confirmed state"
         user = user or getattr(self, 'instance', None)
         if not user:
             raise ValueError('Must specify user or call from related manager')
-        key = self.generate_key()
         now = timezone.now()
         # let email-already-exists exception propogate through
-        address = self.create(
+        address = self._with_unique_key(lambda key: self._create(
             user=user, email=email, key=key, set_at=now, confirmed_at=now,
-        )
+        ))
         return address
 
+    @_routed()
+    @instrumented('create_unconfirmed')
     def create_unconfirmed(self, email, user=None):
         "Create an email address in the unconfirmed state"
         user = user or getattr(self, 'instance', None)
         if not user:
             raise ValueError('Must specify user or call from related manager')
-        key = self.generate_key()
         # let email-already-exists exception propogate through
-        address = self.create(user=user, email=email, key=key)
-        unconfirmed_email_created.send(sender=user, email=email)
+        address = self._with_unique_key(
+            lambda key: self._create(user=user, email=email, key=key),
+        )
+        dispatch(
+            'unconfirmed_email_created', sender=user, using=self.db,
+            email=email,
+        )
         return address
 
+    def generate_keys(self, count):
+        "Generate `count` new random keys and return them as a list"
+        generator = _get_key_generator()
+        if generator is not None:
+            return [generator() for i in range(count)]
+        # one read from the OS for all of them, rather than a random choice
+        # per character
+        data = base64.b32encode(os.urandom(KEY_BYTES * count))
+        return [
+            data[i:i + KEY_LENGTH].decode('ascii')
+            for i in range(0, len(data), KEY_LENGTH)
+        ]
+
+    def _unique_keys(self, count):
+        """
+        Generate `count` new keys, replacing any that a custom key generator
+        produced twice or that are already in use, in one query per attempt.
+        """
+        keys = self.generate_keys(count)
+        if _get_key_generator() is None:
+            return keys
+        for attempt in range(KEY_ATTEMPTS):
+            digests = [self.hash_key(key) for key in keys]
+            taken = set(self.filter(key_digest__in=digests).values_list(
+                'key_digest', flat=True,
+            ))
+            clashes = []
+            for i, digest in enumerate(digests):
+                if digest in taken:
+                    clashes.append(i)
+                taken.add(digest)
+            if not clashes:
+                break
+            for i, key in zip(clashes, self.generate_keys(len(clashes))):
+                keys[i] = key
+        return keys
+
+    def _with_unique_key(self, write):
+        """
+        Call write(key) with a new key and return what it returns. Should a
+        custom key generator produce a key that's already in use, try again
+        with another one.
+        """
+        if _get_key_generator() is None:
+            # collisions of random keys are too unlikely to pay a savepoint
+            return write(self.generate_key())
+        for attempt in range(KEY_ATTEMPTS):
+            key = self.generate_key()
+            try:
+                with transaction.atomic(using=self.db):
+                    return write(key)
+            except IntegrityError:
+                digest = self.hash_key(key)
+                if (attempt == KEY_ATTEMPTS - 1 or
+                        not self.filter(key_digest=digest).exists()):
+                    raise
+
+    @_routed()
+    @instrumented('bulk_create_confirmed')
+    def bulk_create_confirmed(self, pairs, batch_size=500,
+                              on_conflict='raise'):
+        """
+        Create email addresses in the confirmed state for many (user, email)
+        pairs, inserting them `batch_size` at a time. See _bulk_create for
+        `on_conflict`. With 'update', existing unconfirmed addresses are
+        confirmed. Returns the addresses that were created or updated.
+        """
+        return self._bulk_create(pairs, batch_size, on_conflict, True)
+
+    @_routed()
+    @instrumented('bulk_create_unconfirmed')
+    def bulk_create_unconfirmed(self, pairs, batch_size=500,
+                                on_conflict='raise', per_row_signals=False):
+        """
+        Create email addresses in the unconfirmed state for many
+        (user, email) pairs, inserting them `batch_size` at a time. See
+        _bulk_create for `on_conflict`. With 'update', the confirmation of
+        existing unconfirmed addresses is reset. Returns the addresses that
+        were created or updated, with their plaintext keys.
+
+        Sends one unconfirmed_emails_created signal for all the addresses,
+        or, with `per_row_signals`, an unconfirmed_email_created signal for
+        each address instead. Either way, created addresses have no pk on
+        backends that don't return them from bulk inserts (e.g. SQLite and
+        MySQL).
+        """
+        addresses = self._bulk_create(pairs, batch_size, on_conflict, False)
+        if per_row_signals:
+            for address in addresses:
+                dispatch(
+                    'unconfirmed_email_created', sender=address.user,
+                    using=self.db, email=address.email,
+                )
+        elif addresses:
+            dispatch(
+                'unconfirmed_emails_created', sender=self.model,
+                using=self.db, addresses=addresses,
+            )
+        return addresses
+
+    def _bulk_create(self, pairs, batch_size, on_conflict, confirmed):
+        """
+        What to do with (user, email) pairs that already exist, or appear
+        more than once, depends on `on_conflict`:
+          'raise': let the IntegrityError propagate
+          'ignore': skip them
+          'update': skip them, but update existing unconfirmed addresses
+        Note that created addresses only get a pk on backends that return
+        them from bulk inserts.
+        """
+        if on_conflict not in ('raise', 'ignore', 'update'):
+            raise ValueError('on_conflict must be raise, ignore or update')
+
+        pairs = list(pairs)
+        addresses = []
+        for start in range(0, len(pairs), batch_size):
+            with transaction.atomic(using=self.db, savepoint=False):
+                addresses.extend(self._bulk_create_batch(
+                    pairs[start:start + batch_size], on_conflict, confirmed,
+                ))
+        return addresses
+
+    def _bulk_create_batch(self, pairs, on_conflict, confirmed):
+        existing = {}
+        if on_conflict != 'raise':
+            for address in self.filter(
+                user__in=set(user.pk for user, email in pairs),
+                normalized_email__in=set(
+                    self.normalize_email(email) for user, email in pairs
+                ),
+            ):
+                existing[(address.user_id, address.normalized_email)] = address
+
+        now = timezone.now()
+        new_addresses, updated_addresses = [], []
+        for (user, email), key in zip(pairs, self._unique_keys(len(pairs))):
+            normalized_email = self.normalize_email(email)
+            if (user.pk, normalized_email) in existing:
+                address = existing[(user.pk, normalized_email)]
+                if (on_conflict == 'update' and address is not None and
+                        not address.is_confirmed):
+                    address.user = user
+                    if not confirmed:
+                        # the key it's reset with
+                        address.key = key
+                    updated_addresses.append(address)
+                # skip any duplicates later on in the batch
+                existing[(user.pk, normalized_email)] = None
+                continue
+            if on_conflict != 'raise':
+                existing[(user.pk, normalized_email)] = None
+            new_addresses.append(self.model(
+                user=user, email=email, normalized_email=normalized_email,
+                key=key,
+                key_digest=self.hash_key(key), set_at=now,
+                confirmed_at=now if confirmed else None,
+            ))
+
+        if _store_keys():
+            self.bulk_create(new_addresses)
+        else:
+            keys = [address.key for address in new_addresses]
+            for address in new_addresses:
+                address.key = None
+            self.bulk_create(new_addresses)
+            for address, key in zip(new_addresses, keys):
+                address.key = key
+
+        if confirmed:
+            self.filter(
+                pk__in=[address.pk for address in updated_addresses],
+            ).update(confirmed_at=now)
+            for address in updated_addresses:
+                address.confirmed_at = now
+            confirmation_cache.invalidate(
+                [user.pk for user, email in pairs], using=self.db,
+            )
+        elif updated_addresses:
+            self._reset_batch(
+                [address.pk for address in updated_addresses], now=now,
+                keys=[address.key for address in updated_addresses],
+            )
+            for address in updated_addresses:
+                address.key_digest = self.hash_key(address.key)
+                address.set_at = now
+                address.confirmed_at = None
+                address.requested_at = None
+
+        return new_addresses + updated_addresses
+
+    def _expired_unconfirmed(self, older_than=None):
+        """ Unconfirmed addresses whose key expired, or whose key was set
+            more than `older_than` (a timedelta) ago.
+        """
+        period = older_than
+        if period is None:
+            period = _get_confirmation_period()
+        if period is None:
+            return self.none()
+        return self.filter(
+            confirmed_at__isnull=True, set_at__lte=timezone.now() - period,
+        )
+
+    def _in_batches(self, queryset, batch_size, sleep):
+        "Yield lists of pks from the queryset, `batch_size` at a time"
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            yield pks
+            if sleep:
+                time.sleep(sleep)
+
+    @_routed()
+    @instrumented('delete_expired')
+    def delete_expired(self, older_than=None, batch_size=1000, sleep=0):
+        """
+        Delete unconfirmed addresses whose key expired (or was set more than
+        `older_than` ago), `batch_size` at a time, sleeping `sleep` seconds
+        between batches. Returns the number of deleted addresses.
+        """
+        deleted = 0
+        for pks in self._in_batches(
+            self._expired_unconfirmed(older_than), batch_size, sleep,
+        ):
+            deleted += self._delete_unconfirmed(pks)
+        return deleted
+
+    def _delete_unconfirmed(self, pks):
+        """
+        Delete the addresses with the given pks that are still unconfirmed,
+        in one DELETE query without sending signals. Returns the number of
+        addresses deleted.
+        """
+        # QuerySet.delete() doesn't return how many rows it deleted
+        query = DeleteQuery(self.model)
+        query.add_q(models.Q(pk__in=pks, confirmed_at__isnull=True))
+        cursor = query.get_compiler(self.db).execute_sql(CURSOR)
+        try:
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    @_routed()
+    @instrumented('reset_expired')
+    def reset_expired(self, older_than=None, batch_size=1000, sleep=0):
+        """
+        Reset the confirmation of unconfirmed addresses whose key expired (or
+        was set more than `older_than` ago), `batch_size` at a time, sleeping
+        `sleep` seconds between batches. Returns the number of addresses
+        reset.
+        """
+        reset = 0
+        for pks in self._in_batches(
+            self._expired_unconfirmed(older_than), batch_size, sleep,
+        ):
+            # unless they were confirmed in the meantime
+            reset += self._reset_batch(pks, confirmed_at__isnull=True)
+        return reset
+
+    @_routed()
+    @instrumented('reset_confirmations')
+    def reset_confirmations(self, pks):
+        """
+        Reset the confirmation of the addresses with the given pks, like
+        reset_confirmation() does, in one transaction. Returns the number of
+        addresses reset.
+        """
+        pks = list(pks)
+        reset = self._reset_batch(pks)
+        if confirmation_cache.is_enabled():
+            confirmation_cache.invalidate(
+                self.filter(pk__in=pks).values_list('user_id', flat=True),
+                using=self.db,
+            )
+        return reset
+
+    def _reset_batch(self, pks, now=None, keys=None, **lookups):
+        """
+        Give each address a new key, one UPDATE each, in a transaction. The
+        keys are generated unless given, in the same order as the pks.
+        """
+        if now is None:
+            now = timezone.now()
+        if keys is None:
+            keys = self._unique_keys(len(pks))
+        reset = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            for pk, key in zip(pks, keys):
+                reset += self.filter(pk=pk, **lookups).update(
+                    key=key if _store_keys() else None,
+                    key_digest=self.hash_key(key),
+                    set_at=now, confirmed_at=None, requested_at=None,
+                )
+        return reset
+
+    @_routed(read_only=True)
+    def get_confirmation_statuses(self, users):
+        """
+        Get the confirmation status of the primary email of many Users in
+        at most two queries. `users` may be User instances or their pks.
+        Returns a dict of EmailConfirmationStatus by User pk.
+        """
+        users = list(users)
+        if users and not isinstance(users[0], models.Model):
+            user_model = get_user_model()
+            field_name = getattr(
+                user_model, 'primary_email_field_name', 'email',
+            )
+            primary_emails = dict(
+                user_model._default_manager.using(self.db)
+                .filter(pk__in=users).values_list('pk', field_name)
+            )
+        else:
+            primary_emails = dict(
+                (user.pk, _get_primary_email(user)) for user in users
+            )
+        primary_emails = dict(
+            (pk, self.normalize_email(email))
+            for pk, email in primary_emails.items()
+        )
+
+        addresses = self.filter(
+            user__in=list(primary_emails),
+            normalized_email__in=[
+                email for email in primary_emails.values() if email
+            ],
+        )
+        primary_addresses = dict(
+            (address.user_id, address) for address in addresses
+            if address.normalized_email == primary_emails[address.user_id]
+        )
+
+        statuses = {}
+        for pk in primary_emails:
+            address = primary_addresses.get(pk)
+            statuses[pk] = EmailConfirmationStatus(
+                is_confirmed=bool(address and address.is_confirmed),
+                confirmed_at=address and address.confirmed_at,
+                has_active_confirmation_request=bool(
+                    address and address.is_being_confirmed
+                ),
+            )
+        return statuses
+
+    @_routed(read_only=True)
+    def prefetch_email_addresses(self, users):
+        """
+        Load the EmailAddresses of already-fetched Users with one query and
+        cache them on each User, so the mixin's accessors don't need to hit
+        the database. Returns the Users as a list.
+        """
+        users = list(users)
+        addresses_by_user = defaultdict(list)
+        for address in self.filter(user__in=[user.pk for user in users]):
+            addresses_by_user[address.user_id].append(address)
+        for user in users:
+            user._email_address_cache = addresses_by_user[user.pk]
+            user._email_address_cache_db = self.db
+            for address in user._email_address_cache:
+                address.user = user
+        return users
+
+    @_routed()
+    @instrumented('confirm')
     def confirm(self, key, user=None, save=True):
         "Confirm an email address. Returns the address that was confirmed."
         queryset = self.all()
         if user:
             queryset = queryset.filter(user=user)
-        address = queryset.get(key=key)
+
+        key_digest = self.hash_key(key)
+
+        if save:
+            # Fast path: check the expiration and set confirmed_at in a
+            # single conditional UPDATE. Only one of several concurrent
+            # confirmations of the same key can match it, so the signal is
+            # sent exactly once.
+            now = timezone.now()
+            updated = queryset.filter(
+                key_digest=key_digest, confirmed_at__isnull=True,
+                **_unexpired_lookups(now)
+            ).update(confirmed_at=now)
+            if updated:
+                address = queryset.select_related('user').get(
+                    key_digest=key_digest,
+                )
+                self._confirmed(address)
+                instrumentation.set_outcome('confirmed')
+                return address
+
+        # Find out why the fast path didn't apply: unknown key, expired
+        # key, already confirmed, or we were asked not to save.
+        address = queryset.get(key_digest=key_digest)
 
         if address.is_key_expired:
             raise EmailConfirmationExpired()
 
-        if not address.is_confirmed:
-            address.confirmed_at = timezone.now()
-            if save:
-                address.save(update_fields=['confirmed_at'])
-                email_confirmed.send(sender=address.user, email=address.email)
+        instrumentation.set_outcome(
+            'confirmed' if self._confirm_address(address, save)
+            else 'already_confirmed'
+        )
+        return address
+
+    @_routed()
+    @instrumented('confirm_outcome')
+    def confirm_outcome(self, key):
+        """
+        Confirm an email address by key, returning what happened instead of
+        the address: 'confirmed', 'already_confirmed', 'expired' or
+        'unknown'. Confirming is a single conditional UPDATE. The address is
+        only fetched if it has to be, to send email_confirmed or invalidate
+        the confirmation cache.
+        """
+        key_digest = self.hash_key(key)
+        now = timezone.now()
+        if self.filter(
+            key_digest=key_digest, confirmed_at__isnull=True,
+            **_unexpired_lookups(now)
+        ).update(confirmed_at=now):
+            if signals.email_confirmed.receivers or (
+                    confirmation_cache.is_enabled()):
+                self._confirmed(
+                    self.select_related('user').get(key_digest=key_digest),
+                )
+            outcome = 'confirmed'
+        else:
+            try:
+                set_at, confirmed_at = self.filter(
+                    key_digest=key_digest,
+                ).values_list('set_at', 'confirmed_at').get()
+            except self.model.DoesNotExist:
+                outcome = 'unknown'
+            else:
+                if confirmed_at is not None:
+                    outcome = 'already_confirmed'
+                elif _is_expired(set_at):
+                    outcome = 'expired'
+                else:
+                    # reset between the two queries
+                    outcome = 'unknown'
+        instrumentation.set_outcome(outcome)
+        return outcome
 
+    @_routed()
+    @instrumented('confirm_token')
+    def confirm_token(self, token, user=None, save=True):
+        """
+        Confirm an email address using a token from get_confirmation_token().
+        Returns the address that was confirmed.
+        """
+        try:
+            pk, email, set_at = signing.loads(token, salt=TOKEN_SALT)
+            set_at = parse_datetime(set_at)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise self.model.DoesNotExist('Invalid confirmation token')
+
+        # tokens carry their own expiration, no need to hit the database
+        if _is_expired(set_at):
+            raise EmailConfirmationExpired()
+
+        queryset = self.all()
+        if user:
+            queryset = queryset.filter(user=user)
+        address = queryset.select_related('user').get(pk=pk)
+
+        # resetting the confirmation moves set_at, invalidating old tokens
+        if (address.email != email or
+                _as_stored(address.set_at, self.db) != set_at):
+            raise self.model.DoesNotExist('Confirmation token was reset')
+
+        instrumentation.set_outcome(
+            'confirmed' if self._confirm_address(address, save)
+            else 'already_confirmed'
+        )
         return address
 
+    @_routed()
+    @instrumented('request_confirmation')
+    def request_confirmation(self, address, when=None):
+        """
+        Record that confirmation of the address is being requested, unless
+        that's too soon after the last request or too many requests were
+        made lately (see the REQUEST_INTERVAL and REQUEST_LIMIT settings).
+        Returns whether it was recorded, that is whether to send the
+        confirmation. Checking and recording is a single conditional UPDATE,
+        so concurrent requests can't both get through.
+        """
+        if when is None:
+            when = timezone.now()
+        interval, limit = _get_request_throttle()
+        queryset = self.filter(pk=address.pk)
+        if interval is not None:
+            queryset = queryset.filter(
+                models.Q(requested_at__isnull=True) |
+                models.Q(requested_at__lte=when - interval)
+            )
+
+        if limit is None:
+            recorded = queryset.update(requested_at=when)
+        else:
+            count, window = limit
+            # start a new window if the last one is over...
+            recorded = queryset.filter(
+                models.Q(request_window_started_at__isnull=True) |
+                models.Q(request_window_started_at__lte=when - window)
+            ).update(
+                requested_at=when, request_count=1,
+                request_window_started_at=when,
+            )
+            if recorded:
+                address.request_count = 1
+                address.request_window_started_at = when
+            else:
+                # ...or count the request in the current one, if allowed
+                recorded = queryset.filter(
+                    request_window_started_at__gt=when - window,
+                    request_count__lt=count,
+                ).update(
+                    requested_at=when,
+                    request_count=models.F('request_count') + 1,
+                )
+                if recorded:
+                    address.request_count += 1
+
+        if not recorded:
+            instrumentation.set_outcome('throttled')
+            return False
+        address.requested_at = when
+        return True
+
+    def _confirm_address(self, address, save):
+        """ Mark an address confirmed, unless some other request already did.
+            Returns whether this call confirmed it.
+        """
+        if address.is_confirmed:
+            return False
+        address.confirmed_at = timezone.now()
+        if not save:
+            return True
+        if not self.filter(
+            pk=address.pk, confirmed_at__isnull=True,
+        ).update(confirmed_at=address.confirmed_at):
+            return False
+        self._confirmed(address)
+        return True
+
+    def _confirmed(self, address):
+        "Let everyone know an address was just confirmed"
+        confirmation_cache.invalidate([address.user_id], using=self.db)
+        dispatch(
+            'email_confirmed', sender=address.user, using=self.db,
+            email=address.email,
+        )
+
+
+def _generate_key():
+    "Default for EmailAddress.key, so new EmailAddresses have a key"
+    return EmailAddress._default_manager.generate_key()
+
 
 class EmailAddress(models.Model):
     "An email address belonging to a User"
@@ -210,7 +1337,13 @@ class EmailAddress(models.Model):
         settings.AUTH_USER_MODEL, related_name='email_address_set',
     )
     email = models.EmailField(max_length=255)
-    key = models.CharField(max_length=40, unique=True)
+    normalized_email = models.CharField(
+        max_length=255, db_index=True, editable=False,
+    )
+    key = models.CharField(
+        max_length=40, blank=True, null=True, default=_generate_key,
+    )
+    key_digest = models.CharField(max_length=64, unique=True, editable=False)
 
     set_at = models.DateTimeField(
         default=timezone.now,
@@ -221,14 +1354,22 @@ class EmailAddress(models.Model):
         help_text=_('First time this email was confirmed'),
     )
     requested_at = models.DateTimeField(
-        blank=True, null=True,
+        blank=True, null=True, db_index=True,
         help_text=_('Last time confirmation was requested for this email'),
     )
+    request_count = models.PositiveIntegerField(
+        default=0,
+        help_text=_('Confirmation requests since request_window_started_at'),
+    )
+    request_window_started_at = models.DateTimeField(
+        blank=True, null=True,
+        help_text=_('When the current window of confirmation requests began'),
+    )
 
     objects = EmailAddressManager()
 
     class Meta:
-        unique_together = (('user', 'email'),)
+        unique_together = (('user', 'normalized_email'),)
         verbose_name_plural = "email addresses"
 
     def __str__(self):
@@ -242,7 +1383,10 @@ class EmailAddress(models.Model):
 
     @property
     def is_primary(self):
-        return bool(self.user.email == self.email)
+        primary_email = _get_primary_email(self.user)
+        return self._default_manager.normalize_email(primary_email) == (
+            self.normalized_email
+        )
 
     @property
     def is_being_confirmed(self):
@@ -250,31 +1394,97 @@ class EmailAddress(models.Model):
 
     @property
     def key_expires_at(self):
-        # By default, keys don't expire. If you want them to, set
-        # settings.SIMPLE_EMAIL_CONFIRMATION_PERIOD to a timedelta.
-        period = getattr(
-            settings, 'SIMPLE_EMAIL_CONFIRMATION_PERIOD', None
-        )
-        return self.set_at + period if period is not None else None
+        return _get_expires_at(self.set_at)
 
     @property
     def is_key_expired(self):
-        return self.key_expires_at and timezone.now() >= self.key_expires_at
+        return _is_expired(self.set_at)
+
+    def get_confirmation_token(self):
+        """
+        Return a signed token that confirms this email until the
+        confirmation is reset or expires. Nothing is stored.
+        """
+        # sign set_at as stored, not as it is on a freshly saved instance
+        set_at = _as_stored(self.set_at, self._state.db or 'default')
+        return signing.dumps(
+            [self.pk, self.email, set_at.isoformat()], salt=TOKEN_SALT,
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = list(update_fields)
+
+        self.normalized_email = self._default_manager.normalize_email(
+            self.email,
+        )
+        if update_fields is not None and 'email' in update_fields:
+            update_fields.append('normalized_email')
+
+        if self.key:
+            self.key_digest = self._default_manager.hash_key(self.key)
+            if update_fields is not None and 'key' in update_fields:
+                update_fields.append('key_digest')
+
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
 
+        if _store_keys():
+            return super(EmailAddress, self).save(*args, **kwargs)
+
+        # keep the plaintext key on the instance, but don't store it
+        key, self.key = self.key, None
+        try:
+            return super(EmailAddress, self).save(*args, **kwargs)
+        finally:
+            self.key = key
+
+    def delete(self, *args, **kwargs):
+        # not a post_delete receiver: that would stop delete_expired() from
+        # deleting without fetching the addresses first
+        result = super(EmailAddress, self).delete(*args, **kwargs)
+        confirmation_cache.invalidate([self.user_id], using=kwargs.get(
+            'using', self._state.db,
+        ))
+        return result
+
+    def regenerate_key(self):
+        """
+        Re-generate the confirmation key, leaving its expiration untouched.
+        Note that the previous confirmation key will cease to work.
+        """
+        def write(key):
+            self.key = key
+            self.save(update_fields=['key'])
+            return key
+        return self._key_manager()._with_unique_key(write)
+
+    @instrumented('reset_confirmation')
     def reset_confirmation(self):
         """
         Re-generate the confirmation key and key expiration associated
         with this email.  Note that the previous confirmation key will
         cease to work.
         """
-        self.key = self._default_manager.generate_key()
         self.set_at = timezone.now()
 
         self.confirmed_at = None
         self.requested_at = None
-        self.save(update_fields=['key', 'set_at', 'confirmed_at', 'requested_at'])
-        return self.key
 
+        def write(key):
+            self.key = key
+            self.save(update_fields=[
+                'key', 'set_at', 'confirmed_at', 'requested_at',
+            ])
+            return key
+        return self._key_manager()._with_unique_key(write)
+
+    def _key_manager(self):
+        # the manager on the database this address lives in
+        return self._default_manager.db_manager(self._state.db)
+
+    @instrumented('set_requested')
     def set_requested(self, when=None):
         "Records that a confirmation request has been made"
         if when is None:
@@ -283,32 +1493,49 @@ class EmailAddress(models.Model):
         self.save(update_fields=['requested_at'])
 
 
-# by default, auto-add unconfirmed EmailAddress objects for new Users
-if getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_AUTO_ADD', True):
-    def auto_add(sender, **kwargs):
-        if sender == get_user_model() and kwargs['created']:
-            user = kwargs.get('instance')
-            # softly failing on using these methods on `user` to support
-            # not using the SimpleEmailConfirmationMixin in your User model
-            # https://github.com/mfogel/django-simple-email-confirmation/pull/3
-            if hasattr(user, 'get_primary_email'):
-                email = user.get_primary_email()
+def auto_add(sender, **kwargs):
+    "Add an unconfirmed EmailAddress for the primary email of new Users"
+    if kwargs['created']:
+        user = kwargs.get('instance')
+        # softly failing on using these methods on `user` to support
+        # not using the SimpleEmailConfirmationMixin in your User model
+        # https://github.com/mfogel/django-simple-email-confirmation/pull/3
+        email = _get_primary_email(user)
+        if email:
+            if hasattr(user, 'add_unconfirmed_email'):
+                user.add_unconfirmed_email(email)
             else:
-                email = user.email
-            if email:
-                if hasattr(user, 'add_unconfirmed_email'):
-                    user.add_unconfirmed_email(email)
-                else:
-                    user.email_address_set.create_unconfirmed(email)
+                user.email_address_set.create_unconfirmed(email)
+
+
+def invalidate_confirmation_cache(sender, **kwargs):
+    "Forget the cached confirmation state of the User of a saved address"
+    address = kwargs['instance']
+    confirmation_cache.invalidate(
+        [address.user_id], using=kwargs.get('using', 'default'),
+    )
+
+
+def invalidate_user_confirmation_cache(sender, **kwargs):
+    "Forget the cached confirmation state of a User changing primary email"
+    confirmation_cache.invalidate([sender.pk])
+
 
-    # TODO: try to only connect this to the User model. We can't use
-    #       get_user_model() here - results in import loop.
+# saves from other processes share the cache, so they invalidate it too
+post_save.connect(invalidate_confirmation_cache, sender=EmailAddress)
+primary_email_changed.connect(invalidate_user_confirmation_cache)
 
-    post_save.connect(auto_add)
 
+# by default, auto-add unconfirmed EmailAddress objects for new Users. On
+# django 1.7+, SimpleEmailConfirmationConfig.ready() connects auto_add to
+# the User model only. Older versions can't call get_user_model() here -
+# results in import loop - so listen to every model instead.
+try:
+    from django.apps import AppConfig  # noqa
+except ImportError:
+    if getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_AUTO_ADD', True):
+        def _auto_add_any_model(sender, **kwargs):
+            if sender == get_user_model():
+                auto_add(sender, **kwargs)
 
-@receiver(post_init, sender=EmailAddress)
-def _auto_generate_confirmation_key(sender, instance, **kwargs):
-    "Make sure EmailAddresses have a confirmation key after creation"
-    if not instance.key:
-        instance.key = instance._default_manager.generate_key()
+        post_save.connect(_auto_add_any_model)
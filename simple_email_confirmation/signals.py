@@ -2,6 +2,10 @@ from django.dispatch import Signal
 
 email_confirmed = Signal(providing_args=['user', 'email'])
 unconfirmed_email_created = Signal(providing_args=['user', 'email'])
+# sent by EmailAddress.objects.bulk_create_unconfirmed(). Created addresses
+# only have a pk on backends returning them from bulk inserts (PostgreSQL,
+# not SQLite or MySQL): look them up by user_id and normalized_email.
+unconfirmed_emails_created = Signal(providing_args=['addresses'])
 primary_email_changed = Signal(
     providing_args=['user', 'new_email', 'old_email'],
 )
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import hashlib
+from south.db import db
+from south.v2 import SchemaMigration
+from django.conf import settings
+from django.db import models
+
+from django.contrib.auth import get_user_model
+User = get_user_model()
+user_orm_label = '%s.%s' % (User._meta.app_label, User._meta.object_name)
+user_model_label = '%s.%s' % (User._meta.app_label, User._meta.module_name)
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'EmailAddress.key_digest'
+        db.add_column('simple_email_confirmation_emailaddress', 'key_digest',
+                      self.gf('django.db.models.fields.CharField')(max_length=64, null=True),
+                      keep_default=False)
+
+        # Removing unique constraint on 'EmailAddress', fields ['key']
+        db.delete_unique('simple_email_confirmation_emailaddress', ['key'])
+
+        # Changing field 'EmailAddress.key'
+        db.alter_column('simple_email_confirmation_emailaddress', 'key', self.gf('django.db.models.fields.CharField')(max_length=40, null=True))
+
+        # Hashing existing keys
+        if not db.dry_run:
+            store_keys = getattr(settings, 'SIMPLE_EMAIL_CONFIRMATION_STORE_KEYS', True)
+            EmailAddress = orm['simple_email_confirmation.EmailAddress']
+            unhashed = EmailAddress.objects.filter(key_digest__isnull=True)
+            while True:
+                rows = list(unhashed.values_list('pk', 'key')[:1000])
+                if not rows:
+                    break
+                for pk, key in rows:
+                    EmailAddress.objects.filter(pk=pk).update(
+                        key=key if store_keys else None,
+                        key_digest=hashlib.sha256(key.encode('utf-8')).hexdigest(),
+                    )
+
+        # Changing field 'EmailAddress.key_digest'
+        db.alter_column('simple_email_confirmation_emailaddress', 'key_digest', self.gf('django.db.models.fields.CharField')(max_length=64))
+
+        # Adding unique constraint on 'EmailAddress', fields ['key_digest']
+        db.create_unique('simple_email_confirmation_emailaddress', ['key_digest'])
+
+    def backwards(self, orm):
+        if not db.dry_run and orm['simple_email_confirmation.EmailAddress'].objects.filter(key__isnull=True).exists():
+            raise RuntimeError('Plaintext confirmation keys are gone, cannot migrate backwards')
+
+        # Removing unique constraint on 'EmailAddress', fields ['key_digest']
+        db.delete_unique('simple_email_confirmation_emailaddress', ['key_digest'])
+
+        # Deleting field 'EmailAddress.key_digest'
+        db.delete_column('simple_email_confirmation_emailaddress', 'key_digest')
+
+        # Changing field 'EmailAddress.key'
+        db.alter_column('simple_email_confirmation_emailaddress', 'key', self.gf('django.db.models.fields.CharField')(max_length=40))
+
+        # Adding unique constraint on 'EmailAddress', fields ['key']
+        db.create_unique('simple_email_confirmation_emailaddress', ['key'])
+
+    models = {
+        'simple_email_confirmation.emailaddress': {
+            'Meta': {'unique_together': "(('user', 'email'),)", 'object_name': 'EmailAddress'},
+            'confirmed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '255'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True', 'blank': 'True'}),
+            'key_digest': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'}),
+            'requested_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'set_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'email_address_set'", 'to': "orm['%s']" % user_orm_label})
+        },
+        user_model_label: {
+        },
+    }
+
+    complete_apps = ['simple_email_confirmation']
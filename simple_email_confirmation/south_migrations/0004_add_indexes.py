@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import connection, models
+
+from django.contrib.auth import get_user_model
+User = get_user_model()
+user_orm_label = '%s.%s' % (User._meta.app_label, User._meta.object_name)
+user_model_label = '%s.%s' % (User._meta.app_label, User._meta.module_name)
+
+UNCONFIRMED_SET_AT_INDEX = 'simple_email_confirmation_emailaddress_unconfirmed_set_at'
+
+
+def supports_partial_indexes():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 8, 0)
+    return False
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding index on 'EmailAddress', fields ['email']
+        db.create_index('simple_email_confirmation_emailaddress', ['email'])
+
+        # Adding index on 'EmailAddress', fields ['requested_at']
+        db.create_index('simple_email_confirmation_emailaddress', ['requested_at'])
+
+        # Adding index on unconfirmed 'EmailAddress', fields ['set_at']
+        if supports_partial_indexes():
+            sql = 'CREATE INDEX {0} ON {1} ({2}) WHERE {3} IS NULL'
+        else:
+            sql = 'CREATE INDEX {0} ON {1} ({3}, {2})'
+        db.execute(sql.format(
+            db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+            db.quote_name('simple_email_confirmation_emailaddress'),
+            db.quote_name('set_at'), db.quote_name('confirmed_at'),
+        ))
+
+    def backwards(self, orm):
+        # Removing index on unconfirmed 'EmailAddress', fields ['set_at']
+        if connection.vendor == 'mysql':
+            sql = 'DROP INDEX {0} ON {1}'
+        else:
+            sql = 'DROP INDEX {0}'
+        db.execute(sql.format(
+            db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+            db.quote_name('simple_email_confirmation_emailaddress'),
+        ))
+
+        # Removing index on 'EmailAddress', fields ['requested_at']
+        db.delete_index('simple_email_confirmation_emailaddress', ['requested_at'])
+
+        # Removing index on 'EmailAddress', fields ['email']
+        db.delete_index('simple_email_confirmation_emailaddress', ['email'])
+
+    models = {
+        'simple_email_confirmation.emailaddress': {
+            'Meta': {'unique_together': "(('user', 'email'),)", 'object_name': 'EmailAddress'},
+            'confirmed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '255', 'db_index': 'True'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True', 'blank': 'True'}),
+            'key_digest': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'}),
+            'requested_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'db_index': 'True', 'blank': 'True'}),
+            'set_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'email_address_set'", 'to': "orm['%s']" % user_orm_label})
+        },
+        user_model_label: {
+        },
+    }
+
+    complete_apps = ['simple_email_confirmation']
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import connection, models
+from django.db.models import Count
+
+from django.contrib.auth import get_user_model
+User = get_user_model()
+user_orm_label = '%s.%s' % (User._meta.app_label, User._meta.object_name)
+user_model_label = '%s.%s' % (User._meta.app_label, User._meta.module_name)
+
+UNCONFIRMED_SET_AT_INDEX = 'simple_email_confirmation_emailaddress_unconfirmed_set_at'
+
+
+def normalize_email(email):
+    local_part, at, domain = (email or '').strip().rpartition('@')
+    if at:
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return (local_part + at + domain).lower()
+
+
+def recreate_unconfirmed_set_at_index():
+    # sqlite rebuilds tables on schema changes, losing the WHERE clause of
+    # partial indexes
+    if connection.vendor != 'sqlite' or db.dry_run:
+        return
+    db.execute('DROP INDEX IF EXISTS {0}'.format(
+        db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+    ))
+    db.execute('CREATE INDEX {0} ON {1} ({2}) WHERE {3} IS NULL'.format(
+        db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+        db.quote_name('simple_email_confirmation_emailaddress'),
+        db.quote_name('set_at'), db.quote_name('confirmed_at'),
+    ))
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'EmailAddress.normalized_email'
+        db.add_column('simple_email_confirmation_emailaddress', 'normalized_email',
+                      self.gf('django.db.models.fields.CharField')(default='', max_length=255),
+                      keep_default=False)
+
+        # Normalizing existing emails
+        if not db.dry_run:
+            EmailAddress = orm['simple_email_confirmation.EmailAddress']
+            # walk the rows by pk: some emails normalize to ''
+            rows = EmailAddress.objects.order_by('pk').values_list('pk', 'email')
+            last_pk = None
+            while True:
+                chunk = rows
+                if last_pk is not None:
+                    chunk = chunk.filter(pk__gt=last_pk)
+                chunk = list(chunk[:1000])
+                if not chunk:
+                    break
+                for pk, email in chunk:
+                    EmailAddress.objects.filter(pk=pk).update(
+                        normalized_email=normalize_email(email),
+                    )
+                last_pk = chunk[-1][0]
+            duplicates = list(
+                EmailAddress.objects.values('user', 'normalized_email')
+                .annotate(count=Count('pk')).filter(count__gt=1)[:10]
+            )
+            if duplicates:
+                raise RuntimeError(
+                    'Some users have email addresses differing only in case, '
+                    'remove all but one of each before migrating: {}'.format(
+                        ', '.join(
+                            '{user} <{normalized_email}>'.format(**duplicate)
+                            for duplicate in duplicates
+                        )
+                    )
+                )
+
+        # Removing unique constraint on 'EmailAddress', fields ['user', 'email']
+        db.delete_unique('simple_email_confirmation_emailaddress', ['user_id', 'email'])
+
+        # Removing index on 'EmailAddress', fields ['email']
+        db.delete_index('simple_email_confirmation_emailaddress', ['email'])
+
+        # Adding unique constraint on 'EmailAddress', fields ['user', 'normalized_email']
+        db.create_unique('simple_email_confirmation_emailaddress', ['user_id', 'normalized_email'])
+
+        # Adding index on 'EmailAddress', fields ['normalized_email']
+        db.create_index('simple_email_confirmation_emailaddress', ['normalized_email'])
+
+        recreate_unconfirmed_set_at_index()
+
+    def backwards(self, orm):
+        # Removing index on 'EmailAddress', fields ['normalized_email']
+        db.delete_index('simple_email_confirmation_emailaddress', ['normalized_email'])
+
+        # Removing unique constraint on 'EmailAddress', fields ['user', 'normalized_email']
+        db.delete_unique('simple_email_confirmation_emailaddress', ['user_id', 'normalized_email'])
+
+        # Adding index on 'EmailAddress', fields ['email']
+        db.create_index('simple_email_confirmation_emailaddress', ['email'])
+
+        # Adding unique constraint on 'EmailAddress', fields ['user', 'email']
+        db.create_unique('simple_email_confirmation_emailaddress', ['user_id', 'email'])
+
+        # Deleting field 'EmailAddress.normalized_email'
+        db.delete_column('simple_email_confirmation_emailaddress', 'normalized_email')
+
+        recreate_unconfirmed_set_at_index()
+
+    models = {
+        'simple_email_confirmation.emailaddress': {
+            'Meta': {'unique_together': "(('user', 'normalized_email'),)", 'object_name': 'EmailAddress'},
+            'confirmed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '255'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True', 'blank': 'True'}),
+            'key_digest': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'}),
+            'normalized_email': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'}),
+            'requested_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'db_index': 'True', 'blank': 'True'}),
+            'set_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'email_address_set'", 'to': "orm['%s']" % user_orm_label})
+        },
+        user_model_label: {
+        },
+    }
+
+    complete_apps = ['simple_email_confirmation']
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import connection, models
+
+from django.contrib.auth import get_user_model
+User = get_user_model()
+user_orm_label = '%s.%s' % (User._meta.app_label, User._meta.object_name)
+user_model_label = '%s.%s' % (User._meta.app_label, User._meta.module_name)
+
+UNCONFIRMED_SET_AT_INDEX = 'simple_email_confirmation_emailaddress_unconfirmed_set_at'
+
+
+def recreate_unconfirmed_set_at_index():
+    # sqlite rebuilds tables on schema changes, losing the WHERE clause of
+    # partial indexes
+    if connection.vendor != 'sqlite' or db.dry_run:
+        return
+    db.execute('DROP INDEX IF EXISTS {0}'.format(
+        db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+    ))
+    db.execute('CREATE INDEX {0} ON {1} ({2}) WHERE {3} IS NULL'.format(
+        db.quote_name(UNCONFIRMED_SET_AT_INDEX),
+        db.quote_name('simple_email_confirmation_emailaddress'),
+        db.quote_name('set_at'), db.quote_name('confirmed_at'),
+    ))
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'EmailAddress.request_count'
+        db.add_column('simple_email_confirmation_emailaddress', 'request_count',
+                      self.gf('django.db.models.fields.PositiveIntegerField')(default=0),
+                      keep_default=False)
+
+        # Adding field 'EmailAddress.request_window_started_at'
+        db.add_column('simple_email_confirmation_emailaddress', 'request_window_started_at',
+                      self.gf('django.db.models.fields.DateTimeField')(null=True, blank=True),
+                      keep_default=False)
+
+        recreate_unconfirmed_set_at_index()
+
+    def backwards(self, orm):
+        # Deleting field 'EmailAddress.request_count'
+        db.delete_column('simple_email_confirmation_emailaddress', 'request_count')
+
+        # Deleting field 'EmailAddress.request_window_started_at'
+        db.delete_column('simple_email_confirmation_emailaddress', 'request_window_started_at')
+
+        recreate_unconfirmed_set_at_index()
+
+    models = {
+        'simple_email_confirmation.emailaddress': {
+            'Meta': {'unique_together': "(('user', 'normalized_email'),)", 'object_name': 'EmailAddress'},
+            'confirmed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '255'}),
+            'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'key': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True', 'blank': 'True'}),
+            'key_digest': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '64'}),
+            'normalized_email': ('django.db.models.fields.CharField', [], {'max_length': '255', 'db_index': 'True'}),
+            'request_count': ('django.db.models.fields.PositiveIntegerField', [], {'default': '0'}),
+            'request_window_started_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'requested_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'db_index': 'True', 'blank': 'True'}),
+            'set_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'email_address_set'", 'to': "orm['%s']" % user_orm_label})
+        },
+        user_model_label: {
+        },
+    }
+
+    complete_apps = ['simple_email_confirmation']
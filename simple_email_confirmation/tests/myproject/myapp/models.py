@@ -1,6 +1,14 @@
-from django.contrib.auth.models import AbstractUser
-from simple_email_confirmation import SimpleEmailConfirmationUserMixin
+from django.contrib.auth.models import AbstractUser, UserManager
+from simple_email_confirmation import (
+    SimpleEmailConfirmationUserMixin, SimpleEmailConfirmationUserQuerySet,
+)
+
+
+class SimpleEmailConfirmationUserManager(UserManager):
+
+    def get_queryset(self):
+        return SimpleEmailConfirmationUserQuerySet(self.model, using=self._db)
 
 
 class User(SimpleEmailConfirmationUserMixin, AbstractUser):
-    pass
+    objects = SimpleEmailConfirmationUserManager()
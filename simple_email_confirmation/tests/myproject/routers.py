@@ -0,0 +1,5 @@
+class ReplicaRouter(object):
+    "Lets objects on the default database and its replica be related"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
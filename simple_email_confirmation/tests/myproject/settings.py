@@ -55,9 +55,17 @@ WSGI_APPLICATION = 'project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-    }
+    },
+    # not a mirror, so tests can tell which database was read
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
 }
 
+DATABASE_ROUTERS = [
+    'simple_email_confirmation.tests.myproject.routers.ReplicaRouter',
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/dev/topics/i18n/
 
@@ -1,17 +1,43 @@
 from datetime import timedelta
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
 from time import sleep
 
+import django
 from django.conf import settings
+from django.contrib.admin import site as admin_site
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models.signals import post_save
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
 
+try:
+    from unittest import skipIf
+except ImportError:
+    # python 2.6
+    from django.utils.unittest import skipIf
+
+from .. import cache as confirmation_cache, dispatch, instrumentation
+from ..admin import EstimatedCountPaginator
 from ..exceptions import (
     EmailConfirmationExpired, EmailIsPrimary, EmailNotConfirmed,
 )
-from ..models import EmailAddress
+from ..models import EmailAddress, auto_add
 from ..signals import (
-    email_confirmed, unconfirmed_email_created, primary_email_changed,
+    email_confirmed, unconfirmed_email_created, unconfirmed_emails_created,
+    primary_email_changed,
 )
 
 
@@ -32,6 +58,14 @@ class EmailConfirmationTestCase(TestCase):
         self.assertNotEqual(key2, key3)
         self.assertNotEqual(key1, key3)
 
+    def test_new_address_has_key(self):
+        address = EmailAddress(user=self.user, email='test@test.test')
+        self.assertTrue(address.key)
+        address.save()
+        self.assertEqual(
+            address.key_digest, EmailAddress.objects.hash_key(address.key),
+        )
+
     def test_create_confirmed(self):
         "Add an unconfirmed email for a User"
         email = 'test@test.test'
@@ -259,3 +293,1923 @@ class AddEmailIfNotExistsTestCase(TestCase):
         self.assertEqual(self.user.email_address_set.count(), 3)
         address = self.user.email_address_set.get(email=self.email2)
         self.assertEqual(address.is_confirmed, True)
+
+
+class EmailAddressCacheTestCase(TestCase):
+
+    def setUp(self):
+        email = 'nobody@important.com'
+        get_user_model().objects.create_user('uname', email=email)
+        # fresh instance, with nothing cached
+        self.user = get_user_model().objects.get(username='uname')
+
+    def test_accessors_share_one_query(self):
+        "All read accessors are answered from a single query"
+        with self.assertNumQueries(1):
+            self.user.is_confirmed
+            self.user.confirmed_at
+            self.user.has_active_confirmation_request
+            self.user.get_confirmed_emails()
+            self.user.get_unconfirmed_emails()
+            self.user.get_confirmation_key()
+            self.user.get_confirmation_key(self.user.email)
+
+    def test_uses_prefetched_addresses(self):
+        user = get_user_model().objects.prefetch_related(
+            'email_address_set',
+        ).get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(user.is_confirmed)
+            self.assertIn(user.email, user.get_unconfirmed_emails())
+
+    def test_confirmation_status(self):
+        with self.assertNumQueries(1):
+            status = self.user.get_confirmation_status()
+        self.assertEqual(status, (
+            self.user.is_confirmed, self.user.confirmed_at,
+            self.user.has_active_confirmation_request,
+        ))
+
+    def test_add_email_clears_cache(self):
+        email1, email2 = '1@t.t', '2@t.t'
+        self.assertEqual(self.user.get_unconfirmed_emails(), [self.user.email])
+
+        with self.assertNumQueries(1):
+            self.user.add_unconfirmed_email(email1)
+        with self.assertNumQueries(1):
+            self.assertIn(email1, self.user.get_unconfirmed_emails())
+
+        self.user.add_confirmed_email(email2)
+        self.assertEqual(self.user.get_confirmed_emails(), [email2])
+
+    def test_confirm_email_clears_cache(self):
+        self.assertFalse(self.user.is_confirmed)
+        self.user.confirm_email(self.user.get_confirmation_key())
+        with self.assertNumQueries(1):
+            self.assertTrue(self.user.is_confirmed)
+            self.assertTrue(self.user.confirmed_at)
+
+    def test_reset_email_confirmation_clears_cache(self):
+        email = '1@t.t'
+        self.user.add_confirmed_email(email)
+        self.assertIn(email, self.user.get_confirmed_emails())
+
+        key = self.user.reset_email_confirmation(email)
+
+        self.assertIn(email, self.user.get_unconfirmed_emails())
+        self.assertEqual(self.user.get_confirmation_key(email), key)
+
+    def test_add_email_if_not_exists_clears_cache(self):
+        email = '1@t.t'
+        self.user.add_unconfirmed_email(email)
+        old_key = self.user.get_confirmation_key(email)
+
+        key = self.user.add_email_if_not_exists(email)
+
+        self.assertNotEqual(key, old_key)
+        self.assertEqual(self.user.get_confirmation_key(email), key)
+
+    def test_remove_email_clears_cache(self):
+        email = '1@t.t'
+        self.user.add_confirmed_email(email)
+        self.assertIn(email, self.user.get_confirmed_emails())
+
+        self.user.remove_email(email)
+
+        self.assertNotIn(email, self.user.get_confirmed_emails())
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            self.user.get_confirmation_key(email)
+
+    def test_set_primary_email_clears_cache(self):
+        email = '1@t.t'
+        self.user.add_confirmed_email(email)
+        self.assertFalse(self.user.is_confirmed)
+
+        self.user.set_primary_email(email)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.user.is_confirmed)
+
+
+class BulkConfirmationStatusTestCase(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.confirmed = User.objects.create_user('u1', email='1@t.t')
+        self.confirmed.confirm_email(self.confirmed.get_confirmation_key())
+        self.requested = User.objects.create_user('u2', email='2@t.t')
+        self.requested.email_address_set.get().set_requested()
+        self.unconfirmed = User.objects.create_user('u3', email='3@t.t')
+        self.unconfirmed.add_confirmed_email('other@t.t')
+        self.no_email = User.objects.create_user('u4')
+        self.users = [
+            self.confirmed, self.requested, self.unconfirmed, self.no_email,
+        ]
+
+    def assertStatuses(self, statuses):
+        self.assertEqual(len(statuses), 4)
+
+        status = statuses[self.confirmed.pk]
+        self.assertTrue(status.is_confirmed)
+        self.assertIsNotNone(status.confirmed_at)
+        self.assertFalse(status.has_active_confirmation_request)
+
+        status = statuses[self.requested.pk]
+        self.assertFalse(status.is_confirmed)
+        self.assertIsNone(status.confirmed_at)
+        self.assertTrue(status.has_active_confirmation_request)
+
+        status = statuses[self.unconfirmed.pk]
+        self.assertFalse(status.is_confirmed)
+        self.assertIsNone(status.confirmed_at)
+        self.assertFalse(status.has_active_confirmation_request)
+
+        status = statuses[self.no_email.pk]
+        self.assertFalse(status.is_confirmed)
+        self.assertIsNone(status.confirmed_at)
+        self.assertFalse(status.has_active_confirmation_request)
+
+    def test_statuses_from_users(self):
+        with self.assertNumQueries(1):
+            statuses = EmailAddress.objects.get_confirmation_statuses(
+                self.users,
+            )
+        self.assertStatuses(statuses)
+
+    def test_statuses_from_pks(self):
+        with self.assertNumQueries(2):
+            statuses = EmailAddress.objects.get_confirmation_statuses(
+                [user.pk for user in self.users],
+            )
+        self.assertStatuses(statuses)
+
+    def test_statuses_from_user_queryset(self):
+        with self.assertNumQueries(2):
+            queryset = get_user_model().objects.all()
+            statuses = queryset.get_confirmation_statuses()
+        self.assertStatuses(statuses)
+
+    def test_statuses_no_users(self):
+        with self.assertNumQueries(0):
+            statuses = EmailAddress.objects.get_confirmation_statuses([])
+        self.assertEqual(statuses, {})
+
+    def test_prefetch_email_addresses_queryset(self):
+        with self.assertNumQueries(2):
+            users = list(
+                get_user_model().objects.order_by('pk')
+                .prefetch_email_addresses()
+            )
+            self.assertEqual(
+                [user.is_confirmed for user in users],
+                [True, False, False, False],
+            )
+            self.assertEqual(
+                users[2].get_confirmed_emails(), ['other@t.t'],
+            )
+
+    def test_prefetch_email_addresses_list(self):
+        users = list(get_user_model().objects.order_by('pk'))
+        with self.assertNumQueries(1):
+            EmailAddress.objects.prefetch_email_addresses(users)
+            self.assertEqual(
+                [user.has_active_confirmation_request for user in users],
+                [False, True, False, False],
+            )
+            self.assertTrue(users[0].confirmed_at)
+
+
+class PrimaryEmailConfirmationQuerySetTestCase(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.user1 = User.objects.create_user('u1', email='1@t.t')
+        self.user1.confirm_email(self.user1.get_confirmation_key())
+        self.user2 = User.objects.create_user('u2', email='2@t.t')
+        self.user2.add_confirmed_email('other@t.t')
+        self.user3 = User.objects.create_user('u3', email='3@t.t')
+        self.user3.confirm_email(self.user3.get_confirmation_key())
+        self.user4 = User.objects.create_user('u4')
+
+    def test_with_email_confirmation(self):
+        with self.assertNumQueries(1):
+            users = list(
+                get_user_model().objects.all()
+                .with_email_confirmation().order_by('pk')
+            )
+        self.assertEqual(
+            [bool(user.primary_confirmed) for user in users],
+            [True, False, True, False],
+        )
+        self.assertEqual(
+            users[0].primary_confirmed_at, self.user1.confirmed_at,
+        )
+        self.assertIsNone(users[1].primary_confirmed_at)
+        self.assertIsNone(users[3].primary_confirmed_at)
+
+    def test_order_by_primary_confirmed_at(self):
+        users = (
+            get_user_model().objects.all().with_email_confirmation()
+            .primary_email_confirmed().order_by('-primary_confirmed_at')
+        )
+        self.assertEqual(list(users), [self.user3, self.user1])
+
+    def test_filter_primary_email_confirmed(self):
+        queryset = get_user_model().objects.all().order_by('pk')
+        self.assertEqual(
+            list(queryset.primary_email_confirmed()),
+            [self.user1, self.user3],
+        )
+        self.assertEqual(
+            list(queryset.primary_email_unconfirmed()),
+            [self.user2, self.user4],
+        )
+
+
+class ConfirmTestCase(TestCase):
+
+    def setUp(self):
+        email = 'nobody@important.com'
+        user = get_user_model().objects.create_user('uname', email=email)
+        self.key = user.get_confirmation_key()
+        self.email = email
+
+        self.confirmations = []
+
+        def listener(sender, **kwargs):
+            self.confirmations.append((sender, kwargs.get('email')))
+        email_confirmed.connect(listener)
+        self.addCleanup(email_confirmed.disconnect, listener)
+
+    def test_confirm_queries(self):
+        "The UPDATE, then a SELECT for the confirmed address"
+        with self.assertNumQueries(2):
+            address = EmailAddress.objects.confirm(self.key)
+            self.assertEqual(address.user.username, 'uname')
+        self.assertTrue(address.is_confirmed)
+        self.assertTrue(EmailAddress.objects.get(key=self.key).is_confirmed)
+        self.assertEqual(len(self.confirmations), 1)
+        self.assertEqual(self.confirmations[0][1], self.email)
+
+    def test_confirm_twice_sends_signal_once(self):
+        first = EmailAddress.objects.confirm(self.key)
+        second = EmailAddress.objects.confirm(self.key)
+
+        self.assertEqual(first.confirmed_at, second.confirmed_at)
+        self.assertEqual(len(self.confirmations), 1)
+
+    def test_confirm_without_saving(self):
+        with self.assertNumQueries(1):
+            address = EmailAddress.objects.confirm(self.key, save=False)
+        self.assertTrue(address.is_confirmed)
+        self.assertFalse(EmailAddress.objects.get(key=self.key).is_confirmed)
+        self.assertEqual(self.confirmations, [])
+
+    def test_confirm_restricted_to_user(self):
+        other_user = get_user_model().objects.create_user('other')
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            EmailAddress.objects.confirm(self.key, user=other_user)
+        self.assertFalse(EmailAddress.objects.get(key=self.key).is_confirmed)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_confirm_unexpired(self):
+        address = EmailAddress.objects.confirm(self.key)
+        self.assertTrue(address.is_confirmed)
+        self.assertEqual(len(self.confirmations), 1)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_confirm_expired(self):
+        EmailAddress.objects.filter(key=self.key).update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+        with self.assertRaises(EmailConfirmationExpired):
+            EmailAddress.objects.confirm(self.key)
+        self.assertFalse(EmailAddress.objects.get(key=self.key).is_confirmed)
+        self.assertEqual(self.confirmations, [])
+
+
+class RequestConfirmationTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.address = self.user.email_address_set.get()
+        self.now = timezone.now()
+
+    def request(self, minutes=0):
+        return EmailAddress.objects.request_confirmation(
+            self.address, when=self.now + timedelta(minutes=minutes),
+        )
+
+    def test_unthrottled(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.request())
+        self.assertTrue(self.request())
+        self.assertEqual(self.address.requested_at, self.now)
+        self.assertEqual(EmailAddress.objects.get().requested_at, self.now)
+        self.assertTrue(self.user.has_active_confirmation_request)
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_INTERVAL=timedelta(minutes=5),
+    )
+    def test_interval(self):
+        self.assertTrue(self.request())
+        with self.assertNumQueries(1):
+            self.assertFalse(self.request(4))
+        self.assertEqual(EmailAddress.objects.get().requested_at, self.now)
+        self.assertTrue(self.request(5))
+        self.assertFalse(self.request(9))
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_LIMIT=(2, timedelta(hours=1)),
+    )
+    def test_limit(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.request())
+        with self.assertNumQueries(2):
+            self.assertTrue(self.request(1))
+        self.assertFalse(self.request(2))
+        self.assertEqual(self.address.request_count, 2)
+
+        # a new window
+        self.assertTrue(self.request(61))
+        self.assertEqual(self.address.request_count, 1)
+        address = EmailAddress.objects.get()
+        self.assertEqual(address.request_count, 1)
+        self.assertEqual(address.request_window_started_at,
+                         self.now + timedelta(minutes=61))
+        self.assertTrue(self.request(62))
+        self.assertFalse(self.request(63))
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_INTERVAL=timedelta(minutes=5),
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_LIMIT=(2, timedelta(hours=1)),
+    )
+    def test_interval_and_limit(self):
+        self.assertTrue(self.request())
+        self.assertFalse(self.request(1))
+        self.assertTrue(self.request(6))
+        self.assertFalse(self.request(12))
+        self.assertEqual(EmailAddress.objects.get().request_count, 2)
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_INTERVAL=timedelta(minutes=5),
+    )
+    def test_request_email_confirmation(self):
+        self.user.add_unconfirmed_email('2@t.t')
+        self.assertTrue(self.user.request_email_confirmation())
+        self.assertFalse(self.user.request_email_confirmation('1@T.t'))
+        self.assertTrue(self.user.request_email_confirmation('2@t.t'))
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            self.user.request_email_confirmation('3@t.t')
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_REQUEST_LIMIT=(1, timedelta(hours=1)),
+    )
+    def test_reset_confirmation_keeps_count(self):
+        self.assertTrue(self.user.request_email_confirmation())
+        self.user.reset_email_confirmation('1@t.t')
+        self.assertFalse(self.user.request_email_confirmation())
+
+
+class ExpirationQuerySetTestCase(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user('uname')
+        now = timezone.now()
+        self.fresh = user.email_address_set.create_unconfirmed('1@t.t')
+        self.old = user.email_address_set.create_unconfirmed('2@t.t')
+        self.requested = user.email_address_set.create_unconfirmed('3@t.t')
+        self.old_requested = user.email_address_set.create_unconfirmed('4@t.t')
+        EmailAddress.objects.filter(pk__in=[
+            self.old.pk, self.old_requested.pk,
+        ]).update(set_at=now - timedelta(weeks=2))
+        EmailAddress.objects.filter(pk__in=[
+            self.requested.pk, self.old_requested.pk,
+        ]).update(requested_at=now)
+
+    def assertEmails(self, queryset, emails):
+        self.assertEqual(
+            sorted(address.email for address in queryset), emails,
+        )
+
+    def test_no_expiration(self):
+        self.assertEmails(EmailAddress.objects.expired(), [])
+        self.assertEmails(EmailAddress.objects.active(),
+                          ['1@t.t', '2@t.t', '3@t.t', '4@t.t'])
+        self.assertEmails(EmailAddress.objects.being_confirmed(),
+                          ['3@t.t', '4@t.t'])
+        for address in EmailAddress.objects.annotate_expires_at():
+            self.assertIsNone(address.expires_at)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_matches_properties(self):
+        addresses = list(EmailAddress.objects.all())
+        with self.assertNumQueries(3):
+            self.assertEmails(EmailAddress.objects.expired(), [
+                address.email for address in addresses
+                if address.is_key_expired
+            ])
+            self.assertEmails(EmailAddress.objects.active(), [
+                address.email for address in addresses
+                if not address.is_key_expired
+            ])
+            self.assertEmails(EmailAddress.objects.being_confirmed(), [
+                address.email for address in addresses
+                if address.is_being_confirmed
+            ])
+        self.assertEmails(EmailAddress.objects.expired(), ['2@t.t', '4@t.t'])
+        self.assertEmails(EmailAddress.objects.being_confirmed(), ['3@t.t'])
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_annotate_expires_at(self):
+        addresses = EmailAddress.objects.annotate_expires_at()
+        for address in addresses:
+            self.assertEqual(address.expires_at, address.key_expires_at)
+        self.assertEqual(sorted(
+            address.email for address in addresses.order_by('expires_at')[:2]
+        ), ['2@t.t', '4@t.t'])
+
+    def test_chains_from_related_manager(self):
+        user = self.fresh.user
+        self.assertEmails(user.email_address_set.being_confirmed(),
+                          ['3@t.t', '4@t.t'])
+        self.assertEmails(
+            EmailAddress.objects.filter(user=user).being_confirmed(),
+            ['3@t.t', '4@t.t'],
+        )
+
+    def test_setting_read_once(self):
+        EmailAddress.objects.expired()
+        # changed without setting_changed: the cached value is kept
+        settings.SIMPLE_EMAIL_CONFIRMATION_PERIOD = timedelta(1)
+        try:
+            self.assertEmails(EmailAddress.objects.expired(), [])
+        finally:
+            del settings.SIMPLE_EMAIL_CONFIRMATION_PERIOD
+        with self.settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(1)):
+            self.assertEmails(EmailAddress.objects.expired(),
+                              ['2@t.t', '4@t.t'])
+        self.assertEmails(EmailAddress.objects.expired(), [])
+
+
+class AdminTestCase(TestCase):
+    urls = 'simple_email_confirmation.tests.urls'
+    url = '/admin/simple_email_confirmation/emailaddress/'
+
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_superuser('admin', 'admin@t.t', 'admin')
+        self.client.login(username='admin', password='admin')
+        self.user = User.objects.create_user('uname', email='1@t.t')
+        self.user.add_confirmed_email('2@t.t')
+        self.user.add_unconfirmed_email('Old@T.t')
+        EmailAddress.objects.filter(email='Old@T.t').update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+
+    def get_emails(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            address.email for address in response.context['cl'].result_list
+        )
+
+    def act(self, action, emails):
+        pks = [
+            EmailAddress.objects.filter_email(email).get().pk
+            for email in emails
+        ]
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(self.url, {
+                'action': action, '_selected_action': pks,
+            })
+        return len(context)
+
+    def test_changelist_queries_dont_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_emails()
+        User = get_user_model()
+        for i in range(5):
+            User.objects.create_user('u{}'.format(i), email='{}@u.t'.format(i))
+        with self.assertNumQueries(len(context)):
+            self.assertEqual(len(self.get_emails()), 9)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_status_filter(self):
+        self.assertEqual(self.get_emails(status='confirmed'), ['2@t.t'])
+        self.assertEqual(self.get_emails(status='unconfirmed'),
+                         ['1@t.t', 'Old@T.t', 'admin@t.t'])
+        self.assertEqual(self.get_emails(status='expired'), ['Old@T.t'])
+        self.user.request_email_confirmation()
+        self.assertEqual(self.get_emails(status='being_confirmed'),
+                         ['1@t.t'])
+
+    def test_search(self):
+        self.assertEqual(self.get_emails(q='OLD'), ['Old@T.t'])
+        self.assertEqual(self.get_emails(q='1@t.t'), ['1@t.t'])
+        self.assertEqual(self.get_emails(q='t.t'), [])
+        key = self.user.get_confirmation_key('2@t.t')
+        self.assertEqual(self.get_emails(q=key), ['2@t.t'])
+
+    def test_exact_search(self):
+        model_admin = admin_site._registry[EmailAddress]
+        self.addCleanup(setattr, model_admin, 'search_mode', 'prefix')
+        model_admin.search_mode = 'exact'
+        self.assertEqual(self.get_emails(q='OLD'), [])
+        self.assertEqual(self.get_emails(q='old@t.t'), ['Old@T.t'])
+
+    def test_forms_dont_expose_keys(self):
+        address = self.user.email_address_set.get(email='2@t.t')
+        response = self.client.get('{0}{1}/'.format(self.url, address.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('key', response.context['adminform'].form.fields)
+        self.assertNotContains(response, address.key)
+
+        response = self.client.post(self.url + 'add/', {
+            'user': self.user.pk, 'email': '3@example.com',
+            'set_at_0': '2014-01-01', 'set_at_1': '00:00:00',
+            'request_count': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        address = self.user.email_address_set.get(email='3@example.com')
+        self.assertEqual(EmailAddress.objects.confirm(address.key), address)
+
+    def test_confirm_action(self):
+        queries = self.act('confirm', ['1@t.t'])
+        # set-based: no more queries for more addresses
+        self.assertEqual(self.act('confirm', ['1@t.t', 'Old@T.t']), queries)
+        self.assertEqual(self.get_emails(status='confirmed'),
+                         ['1@t.t', '2@t.t', 'Old@T.t'])
+
+    def test_reset_confirmation_action(self):
+        key = self.user.get_confirmation_key('2@t.t')
+        self.act('reset_confirmation', ['2@t.t', 'Old@T.t'])
+        self.assertEqual(self.get_emails(status='confirmed'), [])
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            EmailAddress.objects.confirm(key)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_CACHE='default')
+    def test_delete_action_invalidates_cache(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user.confirm_email(self.user.get_confirmation_key())
+        self.assertTrue(get_user_model().objects.get(pk=self.user.pk)
+                        .is_confirmed)
+        pks = list(self.user.email_address_set.values_list('pk', flat=True))
+        self.client.post(self.url, {
+            'action': 'delete_selected', '_selected_action': pks,
+        })
+        # only asked for confirmation
+        self.assertEqual(self.user.email_address_set.count(), 3)
+        self.client.post(self.url, {
+            'action': 'delete_selected', '_selected_action': pks,
+            'post': 'yes',
+        })
+        self.assertEqual(self.user.email_address_set.count(), 0)
+        self.assertFalse(get_user_model().objects.get(pk=self.user.pk)
+                         .is_confirmed)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_purge_expired_action(self):
+        self.act('purge_expired', ['1@t.t', '2@t.t', 'Old@T.t'])
+        self.assertEqual(self.get_emails(), ['1@t.t', '2@t.t', 'admin@t.t'])
+
+    def test_estimated_count(self):
+        class Estimated(EstimatedCountPaginator):
+            def _estimate_count(self):
+                return 50000
+
+        self.assertEqual(Estimated(EmailAddress.objects.all(), 10).count,
+                         50000)
+        self.assertEqual(Estimated(
+            EmailAddress.objects.filter(confirmed_at__isnull=True), 10,
+        ).count, 3)
+        Estimated.exact_count_below = 100000
+        self.assertEqual(Estimated(EmailAddress.objects.all(), 10).count, 4)
+        # sqlite has no estimate
+        self.assertEqual(
+            EstimatedCountPaginator(EmailAddress.objects.all(), 10).count, 4,
+        )
+
+
+class ConfirmOutcomeTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.key = self.user.get_confirmation_key()
+
+    def test_single_query_without_receivers(self):
+        receivers, email_confirmed.receivers = email_confirmed.receivers, []
+        try:
+            with self.assertNumQueries(1):
+                outcome = EmailAddress.objects.confirm_outcome(self.key)
+        finally:
+            email_confirmed.receivers = receivers
+        self.assertEqual(outcome, 'confirmed')
+        self.assertTrue(self.user.email_address_set.get().is_confirmed)
+
+    def test_sends_signal(self):
+        confirmations = []
+
+        def listener(sender, **kwargs):
+            confirmations.append((sender, kwargs['email']))
+        email_confirmed.connect(listener)
+        self.addCleanup(email_confirmed.disconnect, listener)
+
+        with self.assertNumQueries(2):
+            EmailAddress.objects.confirm_outcome(self.key)
+        self.assertEqual(confirmations, [(self.user, '1@t.t')])
+
+    def test_outcomes(self):
+        manager = EmailAddress.objects
+        self.assertEqual(manager.confirm_outcome('nope'), 'unknown')
+        self.assertEqual(manager.confirm_outcome(self.key), 'confirmed')
+        with self.assertNumQueries(2):
+            self.assertEqual(manager.confirm_outcome(self.key),
+                             'already_confirmed')
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_expired(self):
+        EmailAddress.objects.update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+        self.assertEqual(EmailAddress.objects.confirm_outcome(self.key),
+                         'expired')
+        self.assertFalse(self.user.email_address_set.get().is_confirmed)
+
+
+class ConfirmViewTestCase(TestCase):
+    urls = 'simple_email_confirmation.tests.urls'
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.key = self.user.get_confirmation_key()
+        self.url = reverse(
+            'simple_email_confirmation_confirm', args=[self.key],
+        )
+
+    def test_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content,
+                         b'Your email address is confirmed.')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertTrue(self.user.email_address_set.get().is_confirmed)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.content,
+                         b'Your email address is already confirmed.')
+
+    def test_post(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.user.email_address_set.get().is_confirmed)
+
+    def test_other_methods(self):
+        self.assertEqual(self.client.put(self.url).status_code, 405)
+        self.assertFalse(self.user.email_address_set.get().is_confirmed)
+
+    def test_unknown(self):
+        response = self.client.get(reverse(
+            'simple_email_confirmation_confirm', args=['nope'],
+        ))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+        self.assertIn('max-age=0', response['Cache-Control'])
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_expired(self):
+        EmailAddress.objects.update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 410)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        other_url = reverse('simple_email_confirmation_confirm', args=['x'])
+        response = self.client.get(other_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_after_reset(self):
+        etag = self.client.get(self.url)['ETag']
+        self.user.email_address_set.get().reset_confirmation()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_after_removal(self):
+        etag = self.client.get(self.url)['ETag']
+        self.user.email_address_set.get().delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_success_url(self):
+        response = self.client.get('/redirect/{}/'.format(self.key))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith('/done/'))
+        response = self.client.get('/redirect/nope/')
+        self.assertEqual(response.status_code, 404)
+
+
+class HashedKeyTestCase(TestCase):
+
+    def setUp(self):
+        email = 'nobody@important.com'
+        self.user = get_user_model().objects.create_user('uname', email=email)
+
+    def test_key_digest_stored(self):
+        key = self.user.add_unconfirmed_email('1@t.t')
+        address = EmailAddress.objects.get(email='1@t.t')
+        self.assertEqual(address.key, key)
+        self.assertEqual(
+            address.key_digest, EmailAddress.objects.hash_key(key),
+        )
+        self.assertEqual(len(address.key_digest), 64)
+
+    def test_reset_confirmation_updates_digest(self):
+        old_key = self.user.add_unconfirmed_email('1@t.t')
+        key = self.user.reset_email_confirmation('1@t.t')
+
+        self.assertEqual(
+            EmailAddress.objects.get(email='1@t.t').key_digest,
+            EmailAddress.objects.hash_key(key),
+        )
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            self.user.confirm_email(old_key)
+        self.assertEqual(self.user.confirm_email(key), '1@t.t')
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_STORE_KEYS=False)
+    def test_plaintext_key_not_stored(self):
+        key = self.user.add_unconfirmed_email('1@t.t')
+
+        self.assertIsNotNone(key)
+        address = EmailAddress.objects.get(email='1@t.t')
+        self.assertIsNone(address.key)
+        self.assertEqual(
+            address.key_digest, EmailAddress.objects.hash_key(key),
+        )
+
+        self.assertEqual(self.user.confirm_email(key), '1@t.t')
+        self.assertEqual(
+            EmailAddress.objects.get(email='1@t.t').key_digest,
+            EmailAddress.objects.hash_key(key),
+        )
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_STORE_KEYS=False)
+    def test_get_confirmation_key_not_stored(self):
+        user = get_user_model().objects.create_user('other', email='o@t.t')
+        old_key = user.get_confirmation_key()
+        user = get_user_model().objects.get(pk=user.pk)
+
+        key = user.get_confirmation_key()
+
+        self.assertNotEqual(key, old_key)
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            user.confirm_email(old_key)
+        self.assertEqual(user.confirm_email(key), 'o@t.t')
+
+
+# keys handed out by next_key(), in order
+queued_keys = []
+
+
+def next_key():
+    return queued_keys.pop(0)
+
+
+with_queued_keys = override_settings(
+    SIMPLE_EMAIL_CONFIRMATION_KEY_GENERATOR=(
+        'simple_email_confirmation.tests.tests.next_key'
+    ),
+)
+
+
+class KeyGeneratorTestCase(TestCase):
+
+    def setUp(self):
+        email = 'nobody@important.com'
+        self.user = get_user_model().objects.create_user('uname', email=email)
+        del queued_keys[:]
+
+    def test_default_keys(self):
+        keys = EmailAddress.objects.generate_keys(100)
+
+        self.assertEqual(len(set(keys)), 100)
+        for key in keys:
+            self.assertTrue(re.match(r'^[A-Z2-7]{32}$', key), key)
+        self.assertEqual(EmailAddress.objects.generate_keys(0), [])
+
+    @with_queued_keys
+    def test_custom_generator(self):
+        queued_keys.extend(['key1', 'key2'])
+
+        self.assertEqual(self.user.add_unconfirmed_email('1@t.t'), 'key1')
+        self.assertEqual(EmailAddress.objects.generate_key(), 'key2')
+        self.assertEqual(self.user.confirm_email('key1'), '1@t.t')
+
+    @with_queued_keys
+    def test_collision_retried(self):
+        queued_keys.extend(['key1', 'key1', 'key2'])
+        self.user.add_unconfirmed_email('1@t.t')
+
+        self.assertEqual(self.user.add_unconfirmed_email('2@t.t'), 'key2')
+        self.assertEqual(self.user.confirm_email('key2'), '2@t.t')
+
+    @with_queued_keys
+    def test_collision_retried_on_reset(self):
+        queued_keys.extend(['key1', 'key2', 'key1', 'key3'])
+        self.user.add_unconfirmed_email('1@t.t')
+        self.user.add_unconfirmed_email('2@t.t')
+
+        self.assertEqual(self.user.reset_email_confirmation('2@t.t'), 'key3')
+        self.assertEqual(
+            EmailAddress.objects.get(email='2@t.t').key_digest,
+            EmailAddress.objects.hash_key('key3'),
+        )
+
+    @with_queued_keys
+    def test_other_integrity_errors_not_retried(self):
+        queued_keys.extend(['key1', 'key2', 'key3'])
+        self.user.add_unconfirmed_email('1@t.t')
+
+        with self.assertRaises(IntegrityError):
+            self.user.add_unconfirmed_email('1@t.t')
+        self.assertEqual(queued_keys, ['key3'])
+
+    @with_queued_keys
+    def test_too_many_collisions(self):
+        queued_keys.extend(['key1'] * 4)
+        self.user.add_unconfirmed_email('1@t.t')
+
+        with self.assertRaises(IntegrityError):
+            self.user.add_unconfirmed_email('2@t.t')
+        self.assertEqual(queued_keys, [])
+
+    @with_queued_keys
+    def test_bulk_collisions_replaced(self):
+        queued_keys.extend(['key1', 'key1', 'key2', 'key2', 'key3'])
+        self.user.add_unconfirmed_email('1@t.t')
+
+        addresses = EmailAddress.objects.bulk_create_unconfirmed(
+            [(self.user, '2@t.t'), (self.user, '3@t.t')],
+        )
+
+        self.assertEqual(
+            sorted(address.key for address in addresses), ['key2', 'key3'],
+        )
+        self.assertEqual(self.user.confirm_email('key3'), '3@t.t')
+
+
+class ConfirmationTokenTestCase(TestCase):
+
+    def setUp(self):
+        email = 'nobody@important.com'
+        get_user_model().objects.create_user('uname', email=email)
+        self.user = get_user_model().objects.get(username='uname')
+
+    def test_confirm_token(self):
+        with self.assertNumQueries(1):
+            token = self.user.get_confirmation_token()
+            self.user.get_confirmation_token(self.user.email)
+
+        with self.assertNumQueries(2):
+            email = self.user.confirm_email_token(token)
+
+        self.assertEqual(email, self.user.email)
+        self.assertTrue(self.user.is_confirmed)
+
+    def test_confirm_token_without_microseconds(self):
+        features = connection.features
+        self.addCleanup(
+            setattr, features, 'supports_microsecond_precision',
+            features.supports_microsecond_precision,
+        )
+        features.supports_microsecond_precision = False
+        address = self.user.email_address_set.create_unconfirmed('1@t.t')
+        address.set_at = address.set_at.replace(microsecond=123456)
+        # what a database without microsecond precision stores
+        EmailAddress.objects.filter(pk=address.pk).update(
+            set_at=address.set_at.replace(microsecond=0),
+        )
+
+        token = address.get_confirmation_token()
+
+        self.assertEqual(
+            EmailAddress.objects.confirm_token(token).email, '1@t.t',
+        )
+
+    def test_confirm_token_twice(self):
+        confirmations = []
+
+        def listener(sender, **kwargs):
+            confirmations.append(kwargs.get('email'))
+        email_confirmed.connect(listener)
+        self.addCleanup(email_confirmed.disconnect, listener)
+
+        token = self.user.get_confirmation_token()
+        first = EmailAddress.objects.confirm_token(token)
+        with self.assertNumQueries(1):
+            second = EmailAddress.objects.confirm_token(token)
+
+        self.assertEqual(first.confirmed_at, second.confirmed_at)
+        self.assertEqual(confirmations, [self.user.email])
+
+    def test_confirm_token_without_saving(self):
+        token = self.user.get_confirmation_token()
+        with self.assertNumQueries(1):
+            address = EmailAddress.objects.confirm_token(token, save=False)
+        self.assertTrue(address.is_confirmed)
+        self.assertFalse(self.user.email_address_set.get().is_confirmed)
+
+    def test_invalid_token(self):
+        token = self.user.get_confirmation_token()
+        for invalid_token in (token[:-1], 'thisisnotgoingtoappearrandomaly'):
+            with self.assertNumQueries(0):
+                with self.assertRaises(EmailAddress.DoesNotExist):
+                    EmailAddress.objects.confirm_token(invalid_token)
+
+    def test_reset_invalidates_token(self):
+        token = self.user.get_confirmation_token()
+        sleep(0.01)
+        self.user.reset_email_confirmation(self.user.email)
+
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            self.user.confirm_email_token(token)
+        self.user.confirm_email_token(self.user.get_confirmation_token())
+
+    def test_token_restricted_to_user(self):
+        token = self.user.get_confirmation_token()
+        other_user = get_user_model().objects.create_user('other')
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            other_user.confirm_email_token(token)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_expired_token(self):
+        address = self.user.email_address_set.get()
+        address.set_at -= timedelta(weeks=2)
+        address.save()
+        token = address.get_confirmation_token()
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(EmailConfirmationExpired):
+                EmailAddress.objects.confirm_token(token)
+
+
+class AutoAddTestCase(TestCase):
+
+    def test_auto_add(self):
+        user = get_user_model().objects.create_user('uname', email='1@t.t')
+        self.assertEqual(user.get_unconfirmed_emails(), ['1@t.t'])
+
+    def test_auto_add_no_email(self):
+        user = get_user_model().objects.create_user('uname')
+        self.assertEqual(user.email_address_set.count(), 0)
+
+    @skipIf(django.VERSION < (1, 7), 'app loading needs django 1.7+')
+    def test_auto_add_only_receives_user_saves(self):
+        self.assertIn(
+            auto_add, post_save._live_receivers(get_user_model()),
+        )
+        self.assertNotIn(auto_add, post_save._live_receivers(Group))
+
+
+class BulkCreateTestCase(TestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.user1 = User.objects.create_user('u1', email='1@t.t')
+        self.user2 = User.objects.create_user('u2')
+        self.pairs = [
+            (self.user1, 'a@t.t'), (self.user1, 'b@t.t'),
+            (self.user2, 'a@t.t'), (self.user2, 'c@t.t'),
+            (self.user2, 'd@t.t'),
+        ]
+
+        self.signals = []
+
+        def listener(sender, **kwargs):
+            self.signals.append((sender, kwargs))
+        unconfirmed_emails_created.connect(listener)
+        self.addCleanup(unconfirmed_emails_created.disconnect, listener)
+        unconfirmed_email_created.connect(listener)
+        self.addCleanup(unconfirmed_email_created.disconnect, listener)
+
+    def test_bulk_create_unconfirmed(self):
+        addresses = EmailAddress.objects.bulk_create_unconfirmed(
+            self.pairs, batch_size=2,
+        )
+
+        self.assertEqual(len(addresses), 5)
+        self.assertEqual(self.user2.get_unconfirmed_emails(), [
+            'a@t.t', 'c@t.t', 'd@t.t',
+        ])
+        for address in addresses:
+            self.assertEqual(
+                self.user1.email_address_set.confirm(address.key).email
+                if address.user == self.user1 else
+                self.user2.confirm_email(address.key), address.email,
+            )
+        self.assertEqual(self.signals, [
+            (EmailAddress, {'addresses': addresses, 'signal':
+                            unconfirmed_emails_created}),
+        ])
+
+    def test_bulk_create_unconfirmed_per_row_signals(self):
+        EmailAddress.objects.bulk_create_unconfirmed(
+            self.pairs, per_row_signals=True,
+        )
+        self.assertEqual(
+            [(sender, kwargs['email']) for sender, kwargs in self.signals],
+            [(user, email) for user, email in self.pairs],
+        )
+
+    def test_bulk_create_confirmed(self):
+        addresses = EmailAddress.objects.bulk_create_confirmed(self.pairs)
+
+        self.assertEqual(len(addresses), 5)
+        self.assertEqual(
+            self.user1.get_confirmed_emails(), ['a@t.t', 'b@t.t'],
+        )
+        self.assertEqual(self.signals, [])
+
+    def test_bulk_create_batches(self):
+        with self.assertNumQueries(2):
+            EmailAddress.objects.bulk_create_unconfirmed(
+                self.pairs[:4], batch_size=2,
+            )
+        # one more SELECT per batch to find conflicts, no INSERT if there's
+        # nothing new in a batch
+        with self.assertNumQueries(4):
+            EmailAddress.objects.bulk_create_confirmed(
+                self.pairs, batch_size=2, on_conflict='ignore',
+            )
+
+    def test_bulk_create_conflict_raise(self):
+        self.user1.add_unconfirmed_email('a@t.t')
+        with self.assertRaises(IntegrityError):
+            EmailAddress.objects.bulk_create_unconfirmed(self.pairs)
+
+    def test_bulk_create_conflict_ignore(self):
+        key = self.user1.add_unconfirmed_email('a@t.t')
+        pairs = self.pairs + [(self.user2, 'c@t.t')]
+
+        addresses = EmailAddress.objects.bulk_create_confirmed(
+            pairs, on_conflict='ignore',
+        )
+
+        self.assertEqual(len(addresses), 4)
+        self.assertEqual(self.user1.get_confirmation_key('a@t.t'), key)
+        self.assertEqual(self.user1.get_confirmed_emails(), ['b@t.t'])
+        self.assertEqual(self.user2.email_address_set.count(), 3)
+
+    def test_bulk_create_conflict_update(self):
+        key = self.user1.add_unconfirmed_email('a@t.t')
+        self.user2.add_confirmed_email('a@t.t')
+
+        addresses = EmailAddress.objects.bulk_create_unconfirmed(
+            self.pairs, on_conflict='update',
+        )
+
+        self.assertEqual(len(addresses), 4)
+        self.assertNotEqual(self.user1.get_confirmation_key('a@t.t'), key)
+        self.assertIn('a@t.t', self.user2.get_confirmed_emails())
+        updated, = [address for address in addresses if address.pk]
+        self.assertEqual(updated.key, self.user1.get_confirmation_key('a@t.t'))
+
+        addresses = EmailAddress.objects.bulk_create_confirmed(
+            self.pairs, on_conflict='update',
+        )
+        self.assertEqual(len(addresses), 4)
+        self.user1.clear_email_address_cache()
+        self.assertEqual(self.user1.get_unconfirmed_emails(), ['1@t.t'])
+
+    def test_bulk_create_invalid_conflict(self):
+        with self.assertRaises(ValueError):
+            EmailAddress.objects.bulk_create_unconfirmed(
+                self.pairs, on_conflict='replace',
+            )
+
+
+@override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+class PurgeExpiredTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('uname')
+        for email in ('1@t.t', '2@t.t', '3@t.t'):
+            self.user.add_unconfirmed_email(email)
+        self.user.add_confirmed_email('confirmed@t.t')
+        self.user.add_unconfirmed_email('fresh@t.t')
+        EmailAddress.objects.exclude(email='fresh@t.t').update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+
+    def test_delete_expired(self):
+        with self.assertNumQueries(5):
+            deleted = EmailAddress.objects.delete_expired(batch_size=2)
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            sorted(EmailAddress.objects.values_list('email', flat=True)),
+            ['confirmed@t.t', 'fresh@t.t'],
+        )
+
+    def test_delete_expired_skips_confirmed_since(self):
+        pks = list(EmailAddress.objects.filter(
+            email__in=['1@t.t', '2@t.t'],
+        ).values_list('pk', flat=True))
+        # confirmed after the batch was selected
+        EmailAddress.objects.filter(email='1@t.t').update(
+            confirmed_at=timezone.now(),
+        )
+
+        self.assertEqual(EmailAddress.objects._delete_unconfirmed(pks), 1)
+        self.assertTrue(EmailAddress.objects.filter(email='1@t.t').exists())
+        self.assertFalse(EmailAddress.objects.filter(email='2@t.t').exists())
+
+    def test_delete_older_than(self):
+        deleted = EmailAddress.objects.delete_expired(
+            older_than=timedelta(weeks=3),
+        )
+        self.assertEqual(deleted, 0)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=None)
+    def test_delete_without_period(self):
+        self.assertEqual(EmailAddress.objects.delete_expired(), 0)
+        self.assertEqual(
+            EmailAddress.objects.delete_expired(older_than=timedelta(days=1)),
+            3,
+        )
+
+    def test_reset_expired(self):
+        old_key = self.user.get_confirmation_key('1@t.t')
+
+        reset = EmailAddress.objects.reset_expired(batch_size=2)
+
+        self.assertEqual(reset, 3)
+        self.assertEqual(EmailAddress.objects.count(), 5)
+        self.assertEqual(EmailAddress.objects.delete_expired(), 0)
+        address = EmailAddress.objects.get(email='1@t.t')
+        self.assertNotEqual(address.key, old_key)
+        self.assertEqual(self.user.confirm_email(address.key), '1@t.t')
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'purge_email_confirmations', reset=True, batch_size=2, stdout=out,
+        )
+        self.assertEqual(out.getvalue().strip(), 'Reset 3 email addresses')
+
+        out = StringIO()
+        call_command(
+            'purge_email_confirmations', older_than=1, stdout=out,
+        )
+        self.assertEqual(out.getvalue().strip(), 'Deleted 0 email addresses')
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=None)
+    def test_command_without_period(self):
+        with self.assertRaises(CommandError):
+            call_command('purge_email_confirmations')
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=None)
+    def test_command_older_than_zero(self):
+        out = StringIO()
+        call_command('purge_email_confirmations', older_than=0, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Deleted 4 email addresses')
+        self.assertEqual(
+            list(EmailAddress.objects.values_list('email', flat=True)),
+            ['confirmed@t.t'],
+        )
+
+
+class ExportTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.user.add_confirmed_email('2@t.t')
+        self.user.add_unconfirmed_email(u'\xe9@t.t')
+        EmailAddress.objects.filter(email=u'\xe9@t.t').update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+
+    def export(self, **options):
+        out = StringIO()
+        call_command('export_email_addresses', stdout=out, **options)
+        value = out.getvalue()
+        # django writes utf-8 encoded bytes to stdout on python 2
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def test_csv(self):
+        lines = self.export(chunk_size=2).splitlines()
+        self.assertEqual(lines[0], ','.join(
+            'id user_id email is_confirmed confirmed_at set_at requested_at '
+            'expires_at'.split()
+        ))
+        self.assertEqual(
+            [line.split(',')[2:4] for line in lines[1:]],
+            [['1@t.t', 'False'], ['2@t.t', 'True'], [u'\xe9@t.t', 'False']],
+        )
+        address = EmailAddress.objects.get(email='2@t.t')
+        self.assertEqual(lines[2].split(',')[4:], [
+            address.confirmed_at.isoformat(), address.set_at.isoformat(),
+            '', '',
+        ])
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_jsonl(self):
+        rows = [
+            json.loads(line)
+            for line in self.export(format='jsonl').splitlines()
+        ]
+        self.assertEqual([row['email'] for row in rows],
+                         ['1@t.t', '2@t.t', u'\xe9@t.t'])
+        address = EmailAddress.objects.get(email='1@t.t')
+        self.assertEqual(rows[0], {
+            'id': address.pk, 'user_id': self.user.pk, 'email': '1@t.t',
+            'is_confirmed': False, 'confirmed_at': None,
+            'set_at': address.set_at.isoformat(), 'requested_at': None,
+            'expires_at': address.key_expires_at.isoformat(),
+        })
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_filters(self):
+        def emails(**options):
+            return [
+                json.loads(line)['email'] for line in self.export(
+                    format='jsonl', **options
+                ).splitlines()
+            ]
+        self.assertEqual(emails(status='confirmed'), ['2@t.t'])
+        self.assertEqual(emails(status='unconfirmed'), ['1@t.t', u'\xe9@t.t'])
+        self.assertEqual(emails(status='expired'), [u'\xe9@t.t'])
+        yesterday = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(emails(updated_since=yesterday), ['1@t.t', '2@t.t'])
+        self.assertEqual(emails(
+            updated_since=(timezone.now() + timedelta(hours=1)).isoformat(),
+        ), [])
+        with self.assertRaises(CommandError):
+            emails(updated_since='last week')
+
+    def test_queries_per_chunk(self):
+        with self.assertNumQueries(3):
+            self.export(chunk_size=2)
+
+    def test_output_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'export.csv')
+        self.assertEqual(
+            self.export(output=path).strip(), 'Exported 3 email addresses',
+        )
+        with io.open(path, encoding='utf-8', newline='') as f:
+            lines = f.read().split('\r\n')
+        self.assertEqual(len(lines), 5)
+        self.assertIn(u'\xe9@t.t', lines[3])
+
+    def test_jsonl_output_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'export.jsonl')
+        self.assertEqual(
+            self.export(format='jsonl', output=path).strip(),
+            'Exported 3 email addresses',
+        )
+        with io.open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row['email'] for row in rows],
+                         ['1@t.t', '2@t.t', u'\xe9@t.t'])
+
+
+class NormalizedEmailTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='Nobody@Important.com',
+        )
+
+    def test_normalize_email(self):
+        normalize = EmailAddress.objects.normalize_email
+        self.assertEqual(normalize(' Foo@Bar.COM '), 'foo@bar.com')
+        self.assertEqual(
+            normalize(u'x@B\xfccher.DE'), 'x@xn--bcher-kva.de',
+        )
+        self.assertEqual(normalize('no-at-sign'), 'no-at-sign')
+        self.assertEqual(normalize(None), '')
+
+    def test_normalized_email_stored(self):
+        address = self.user.email_address_set.get()
+        self.assertEqual(address.email, 'Nobody@important.com')
+        self.assertEqual(address.normalized_email, 'nobody@important.com')
+
+        address.email = 'Other@Important.com'
+        address.save(update_fields=['email'])
+        self.assertEqual(
+            EmailAddress.objects.filter_email('OTHER@important.com').get(),
+            address,
+        )
+
+    def test_lookups_ignore_case(self):
+        key = self.user.get_confirmation_key('nobody@IMPORTANT.com')
+        self.assertFalse(self.user.is_confirmed)
+        self.user.confirm_email(key)
+        self.assertTrue(self.user.is_confirmed)
+        self.assertTrue(self.user.email_address_set.get().is_primary)
+        self.assertIsNone(
+            self.user.add_email_if_not_exists('NOBODY@important.com'),
+        )
+        with self.assertRaises(EmailIsPrimary):
+            self.user.remove_email('nobody@important.com')
+
+    def test_set_primary_email_ignores_case(self):
+        self.user.add_confirmed_email('second@important.com')
+        self.user.set_primary_email('Second@Important.com')
+        self.assertTrue(self.user.is_confirmed)
+
+    def test_near_duplicates_rejected(self):
+        with self.assertRaises(IntegrityError):
+            self.user.add_unconfirmed_email('NOBODY@important.com')
+
+    def test_statuses_ignore_case(self):
+        self.user.confirm_email(self.user.get_confirmation_key())
+        self.user.email = 'NOBODY@important.com'
+        self.user.save()
+        statuses = EmailAddress.objects.get_confirmation_statuses([self.user])
+        self.assertTrue(statuses[self.user.pk].is_confirmed)
+        self.assertEqual(
+            list(get_user_model().objects.all().primary_email_confirmed()),
+            [self.user],
+        )
+
+    @skipIf(django.VERSION < (1, 7), 'migrations need django 1.7+')
+    def test_migration_normalizes_blank_emails(self):
+        from importlib import import_module
+        from django.apps import apps
+        migration = import_module(
+            'simple_email_confirmation.migrations.'
+            '0006_emailaddress_normalized_email'
+        )
+        other = get_user_model().objects.create_user('other')
+        other.add_unconfirmed_email(' ')
+        EmailAddress.objects.update(normalized_email='')
+
+        migration.normalize_emails(apps, None)
+
+        self.assertEqual(
+            sorted(EmailAddress.objects.values_list(
+                'normalized_email', flat=True,
+            )),
+            ['', 'nobody@important.com'],
+        )
+
+
+class RecordingExecutor(object):
+    "Sends signals synchronously, recording what it was given"
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append(args)
+        fn(*args, **kwargs)
+
+
+def full_executor():
+    # no workers and room for one call: the second submit() is rejected
+    return dispatch.ThreadPoolExecutor(max_workers=0, queue_size=1)
+
+
+@override_settings(SIMPLE_EMAIL_CONFIRMATION_ASYNC_SIGNALS=True)
+class AsyncSignalTestCase(TestCase):
+
+    def setUp(self):
+        dispatch._executors.clear()
+        dispatch.stats.reset()
+        self.user = get_user_model().objects.create_user('uname')
+        self.emails = []
+        unconfirmed_email_created.connect(self.listener)
+
+    def tearDown(self):
+        unconfirmed_email_created.disconnect(self.listener)
+        dispatch._executors.clear()
+        dispatch.stats.reset()
+
+    def listener(self, sender, email, **kwargs):
+        self.emails.append(email)
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_SIGNAL_EXECUTOR=(
+            'simple_email_confirmation.tests.tests.RecordingExecutor'
+        ),
+    )
+    def test_custom_executor(self):
+        self.user.add_unconfirmed_email('1@t.t')
+        self.assertEqual(
+            dispatch.get_executor().calls,
+            [('unconfirmed_email_created', self.user, {'email': '1@t.t'})],
+        )
+        self.assertEqual(self.emails, ['1@t.t'])
+        stats = dispatch.get_stats()
+        self.assertEqual((stats['submitted'], stats['sent']), (1, 1))
+
+    def test_thread_pool(self):
+        self.user.add_unconfirmed_email('1@t.t')
+        dispatch.get_executor().join()
+        self.assertEqual(self.emails, ['1@t.t'])
+        self.assertEqual(dispatch.get_stats()['queue_size'], 0)
+
+    def test_failing_receiver(self):
+        def failing_listener(sender, **kwargs):
+            raise ValueError()
+        unconfirmed_email_created.connect(failing_listener)
+        dispatch.logger.disabled = True
+        try:
+            self.user.add_unconfirmed_email('1@t.t')
+            dispatch.get_executor().join()
+        finally:
+            dispatch.logger.disabled = False
+            unconfirmed_email_created.disconnect(failing_listener)
+        self.assertEqual(self.emails, ['1@t.t'])
+        self.assertEqual(dispatch.get_stats()['failed'], 1)
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_SIGNAL_EXECUTOR=(
+            'simple_email_confirmation.tests.tests.full_executor'
+        ),
+    )
+    def test_backpressure(self):
+        self.user.add_unconfirmed_email('1@t.t')
+        self.user.add_unconfirmed_email('2@t.t')
+        # the first one is still queued, the second was sent inline
+        self.assertEqual(self.emails, ['2@t.t'])
+        stats = dispatch.get_stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['queue_size'], 1)
+        self.assertEqual(stats['max_queue_size'], 1)
+
+
+@override_settings(SIMPLE_EMAIL_CONFIRMATION_CACHE='default')
+class ConfirmationCacheTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.key = self.user.get_confirmation_key()
+        confirmation_cache.stats.reset()
+
+    def tearDown(self):
+        cache.clear()
+        confirmation_cache.stats.reset()
+
+    def assertCachedConfirmed(self, is_confirmed):
+        "Check the state from a fresh User, then that it's cached"
+        User = get_user_model()
+        self.assertEqual(User.objects.get(pk=self.user.pk).is_confirmed,
+                         is_confirmed)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.is_confirmed, is_confirmed)
+            self.assertEqual(bool(user.confirmed_at), is_confirmed)
+
+    def test_cached(self):
+        self.assertCachedConfirmed(False)
+        self.assertEqual(
+            confirmation_cache.get_stats(),
+            {'hits': 1, 'misses': 1, 'invalidations': 0},
+        )
+
+    def test_confirm_invalidates(self):
+        self.assertCachedConfirmed(False)
+        EmailAddress.objects.confirm(self.key)
+        self.assertCachedConfirmed(True)
+
+    def test_confirm_token_invalidates(self):
+        self.assertCachedConfirmed(False)
+        EmailAddress.objects.confirm_token(
+            self.user.get_confirmation_token(),
+        )
+        self.assertCachedConfirmed(True)
+
+    def test_reset_confirmation_invalidates(self):
+        self.user.confirm_email(self.key)
+        self.assertCachedConfirmed(True)
+        self.user.reset_email_confirmation('1@t.t')
+        self.assertCachedConfirmed(False)
+
+    def test_create_invalidates(self):
+        self.user.add_confirmed_email('2@t.t')
+        self.assertEqual(self.user.get_confirmed_emails(), ['2@t.t'])
+        EmailAddress.objects.bulk_create_confirmed([(self.user, '3@t.t')])
+        user = get_user_model().objects.get(pk=self.user.pk)
+        self.assertEqual(
+            sorted(user.get_confirmed_emails()), ['2@t.t', '3@t.t'],
+        )
+
+    def test_set_primary_email_and_remove_email_invalidate(self):
+        self.user.add_confirmed_email('2@t.t')
+        self.assertCachedConfirmed(False)
+        self.user.set_primary_email('2@t.t')
+        self.assertCachedConfirmed(True)
+        self.user.remove_email('1@t.t')
+        self.user.set_primary_email('1@t.t', require_confirmed=False)
+        self.user.remove_email('2@t.t')
+        self.assertCachedConfirmed(False)
+
+
+@override_settings(SIMPLE_EMAIL_CONFIRMATION_METRICS_SINK=(
+    'simple_email_confirmation.instrumentation.MemorySink'
+))
+class InstrumentationTestCase(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'uname', email='1@t.t',
+        )
+        self.key = self.user.get_confirmation_key()
+        instrumentation._sinks.clear()
+        self.addCleanup(instrumentation._sinks.clear)
+        self.sink = instrumentation.get_sink()
+
+    def assertCounters(self, counters):
+        self.assertEqual(dict(
+            (name[len('simple_email_confirmation.'):], value)
+            for name, value in self.sink.counters.as_dict().items()
+        ), counters)
+
+    def test_confirm_outcomes(self):
+        EmailAddress.objects.confirm(self.key)
+        EmailAddress.objects.confirm(self.key)
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            EmailAddress.objects.confirm('nope')
+        self.assertCounters({
+            'confirm.confirmed': 1,
+            'confirm.already_confirmed': 1,
+            'confirm.unknown': 1,
+            # UPDATE + SELECT, UPDATE + SELECT, UPDATE + SELECT
+            'confirm.queries': 6,
+        })
+        self.assertEqual(
+            self.sink.timings['simple_email_confirmation.confirm'][0], 3,
+        )
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_PERIOD=timedelta(weeks=1))
+    def test_expired_outcomes(self):
+        EmailAddress.objects.update(
+            set_at=timezone.now() - timedelta(weeks=2),
+        )
+        token = EmailAddress.objects.get().get_confirmation_token()
+        with self.assertRaises(EmailConfirmationExpired):
+            EmailAddress.objects.confirm(self.key)
+        with self.assertRaises(EmailConfirmationExpired):
+            EmailAddress.objects.confirm_token(token)
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            EmailAddress.objects.confirm_token('nope')
+        self.assertCounters({
+            'confirm.expired': 1,
+            'confirm.queries': 2,
+            'confirm_token.expired': 1,
+            'confirm_token.unknown': 1,
+            'confirm_token.queries': 0,
+        })
+
+    def test_nested_operations(self):
+        self.user.add_unconfirmed_email('2@t.t')
+        self.user.remove_email('2@t.t')
+        self.assertCounters({
+            'create_unconfirmed.ok': 1,
+            'create_unconfirmed.queries': 1,
+            'remove_email.ok': 1,
+            # SELECT + DELETE
+            'remove_email.queries': 2,
+        })
+
+    def test_queries_not_kept(self):
+        queries = len(connection.queries)
+        EmailAddress.objects.confirm(self.key)
+        self.assertEqual(len(connection.queries), queries)
+
+    @override_settings(DEBUG=True)
+    def test_queries_kept_with_debug(self):
+        use_debug_cursor = connection.use_debug_cursor
+        queries = len(connection.queries)
+        EmailAddress.objects.confirm(self.key)
+        self.assertGreater(len(connection.queries), queries)
+        self.assertEqual(connection.use_debug_cursor, use_debug_cursor)
+        # still logged after the operation
+        queries = len(connection.queries)
+        self.user.email_address_set.count()
+        self.assertEqual(len(connection.queries), queries + 1)
+
+    def test_render(self):
+        EmailAddress.objects.confirm(self.key)
+        lines = self.sink.render().splitlines()
+        self.assertIn('simple_email_confirmation_confirm_confirmed 1', lines)
+        self.assertIn(
+            'simple_email_confirmation_confirm_seconds_count 1', lines,
+        )
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_METRICS_SINK=None)
+    def test_disabled(self):
+        EmailAddress.objects.confirm(self.key)
+        self.assertEqual(self.sink.counters.as_dict(), {})
+        self.assertIsNone(instrumentation.get_sink())
+
+    def test_statsd_sink(self):
+        calls = []
+
+        class Client(object):
+            def incr(self, name, count):
+                calls.append(('incr', name, count))
+
+            def timing(self, name, milliseconds):
+                calls.append(('timing', name, milliseconds))
+
+        sink = instrumentation.StatsdSink(Client())
+        sink.increment('a', 2)
+        sink.timing('b', 0.5)
+        self.assertEqual(calls, [('incr', 'a', 2), ('timing', 'b', 500.0)])
+
+
+class ReadDatabaseTestCase(TestCase):
+    """
+    'replica' stands in for a replica lagging behind: it has the User, but
+    doesn't know their primary email was confirmed.
+    """
+    multi_db = True
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user('uname', email='1@t.t')
+        User.objects.using('replica').create(
+            pk=self.user.pk, username='uname', email='1@t.t',
+        )
+        self.user.confirm_email(self.user.get_confirmation_key())
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def count(self, using, **lookups):
+        return EmailAddress.objects.using(using).filter(**lookups).count()
+
+    def test_reads_default_database(self):
+        user = self.fresh_user()
+
+        self.assertTrue(user.is_confirmed)
+        self.assertEqual(user.get_confirmed_emails(), ['1@t.t'])
+        self.assertEqual(user.get_confirmed_emails(using='replica'), [])
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_READ_DATABASE='replica')
+    def test_reads_read_database(self):
+        user = self.fresh_user()
+
+        self.assertFalse(user.is_confirmed)
+        self.assertIsNone(user.confirmed_at)
+        self.assertEqual(user.get_confirmed_emails(), [])
+        self.assertEqual(user.get_unconfirmed_emails(), ['1@t.t'])
+        self.assertTrue(
+            self.fresh_user().get_confirmation_status(
+                using='default',
+            ).is_confirmed,
+        )
+        self.assertEqual(
+            self.fresh_user().get_confirmed_emails(using='default'),
+            ['1@t.t'],
+        )
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_READ_DATABASE='replica')
+    def test_manager_reads_read_database(self):
+        statuses = EmailAddress.objects.get_confirmation_statuses(
+            [self.user.pk],
+        )
+        self.assertFalse(statuses[self.user.pk].is_confirmed)
+        statuses = EmailAddress.objects.get_confirmation_statuses(
+            [self.user.pk], using='default',
+        )
+        self.assertTrue(statuses[self.user.pk].is_confirmed)
+
+        user, = EmailAddress.objects.prefetch_email_addresses(
+            [self.fresh_user()],
+        )
+        self.assertFalse(user.is_confirmed)
+
+    @override_settings(SIMPLE_EMAIL_CONFIRMATION_READ_DATABASE='replica')
+    def test_writes_stay_on_default_database(self):
+        user = self.fresh_user()
+        self.assertFalse(user.is_confirmed)
+
+        # confirmed as far as the default database knows: nothing to do
+        self.assertIsNone(user.add_email_if_not_exists('1@t.t'))
+
+        key = user.add_email_if_not_exists('2@t.t')
+        self.assertEqual(user.confirm_email(key), '2@t.t')
+        key = user.reset_email_confirmation('2@t.t')
+        self.assertEqual(EmailAddress.objects.confirm(key).email, '2@t.t')
+        user.set_primary_email('2@t.t')
+        user.remove_email('1@t.t')
+
+        self.assertEqual(self.count('default', email='2@t.t'), 1)
+        self.assertEqual(self.count('replica', email='2@t.t'), 0)
+        self.assertEqual(self.count('replica', email='1@t.t'), 1)
+
+    @override_settings(
+        SIMPLE_EMAIL_CONFIRMATION_READ_DATABASE='replica',
+        SIMPLE_EMAIL_CONFIRMATION_CACHE='default',
+    )
+    def test_cache_filled_from_default_database(self):
+        cache.clear()
+        self.assertTrue(self.fresh_user().is_confirmed)
+        # a cache hit
+        self.assertTrue(self.fresh_user().is_confirmed)
+
+    def test_using(self):
+        user = get_user_model().objects.using('replica').get(pk=self.user.pk)
+        key = self.user.add_unconfirmed_email('2@t.t', using='replica')
+
+        self.assertEqual(self.count('replica', email='2@t.t'), 1)
+        self.assertEqual(self.count('default', email='2@t.t'), 0)
+        with self.assertRaises(EmailAddress.DoesNotExist):
+            self.user.confirm_email(key)
+        self.assertEqual(
+            self.user.confirm_email(key, using='replica'), '2@t.t',
+        )
+        self.assertEqual(user.get_confirmed_emails(), ['2@t.t'])
+        self.assertEqual(
+            self.user.get_confirmed_emails(using='replica'), ['2@t.t'],
+        )
+        self.assertEqual(
+            EmailAddress.objects.confirm_outcome(key, using='replica'),
+            'already_confirmed',
+        )
+        self.assertEqual(EmailAddress.objects.confirm_outcome(key), 'unknown')
+
+        self.user.remove_email('2@t.t', using='replica')
+        self.assertEqual(self.count('replica', email='2@t.t'), 0)
+
+    def test_bulk_using(self):
+        addresses = EmailAddress.objects.bulk_create_unconfirmed(
+            [(self.user, '2@t.t'), (self.user, '3@t.t')], using='replica',
+        )
+
+        self.assertEqual(len(addresses), 2)
+        self.assertEqual(self.count('replica', user=self.user.pk), 3)
+        self.assertEqual(self.count('default', user=self.user.pk), 1)
+        self.assertEqual(
+            EmailAddress.objects.reset_confirmations(
+                [address.pk for address in EmailAddress.objects.using(
+                    'replica',
+                ).filter(email__in=['2@t.t', '3@t.t'])],
+                using='replica',
+            ),
+            2,
+        )
+
+
+class QueryCountTestCase(TestCase):
+    "Pins how many queries each public method makes"
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user('uname', email='1@t.t')
+        self.user.confirm_email(self.user.get_confirmation_key())
+        self.key = self.user.add_unconfirmed_email('2@t.t')
+        # no EmailAddress for the primary email of this one
+        self.bare_user = User.objects.create_user('bare')
+        User.objects.filter(pk=self.bare_user.pk).update(email='3@t.t')
+
+    def fresh_user(self, user=None):
+        return get_user_model().objects.get(pk=(user or self.user).pk)
+
+    def assertQueries(self, name, num, func, read_only=False):
+        with CaptureQueriesContext(connection) as context:
+            func()
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(len(queries), num, '{}: {}'.format(name, queries))
+        if read_only:
+            for query in queries:
+                statement = re.search(r'\b(SELECT|INSERT|UPDATE|DELETE)\b',
+                                      query).group(1)
+                self.assertEqual(statement, 'SELECT', name)
+
+    def test_read_accessors(self):
+        accessors = [
+            ('get_primary_email', 0, lambda u: u.get_primary_email()),
+            ('is_confirmed', 1, lambda u: u.is_confirmed),
+            ('confirmed_at', 1, lambda u: u.confirmed_at),
+            ('has_active_confirmation_request', 1,
+             lambda u: u.has_active_confirmation_request),
+            ('get_confirmation_status', 1,
+             lambda u: u.get_confirmation_status()),
+            ('get_confirmed_emails', 1, lambda u: u.get_confirmed_emails()),
+            ('get_unconfirmed_emails', 1,
+             lambda u: u.get_unconfirmed_emails()),
+        ]
+        for user in (self.user, self.bare_user):
+            for name, num, accessor in accessors:
+                user = self.fresh_user(user)
+                self.assertQueries(
+                    name, num, lambda: accessor(user), read_only=True,
+                )
+        self.assertEqual(self.bare_user.email_address_set.count(), 0)
+        self.assertEqual(
+            self.fresh_user(self.bare_user).get_unconfirmed_emails(),
+            ['3@t.t'],
+        )
+
+    def test_confirmation_keys(self):
+        user = self.fresh_user()
+        self.assertQueries('get_confirmation_key', 1,
+                           lambda: user.get_confirmation_key('2@t.t'))
+        self.assertQueries('get_confirmation_token', 0,
+                           lambda: user.get_confirmation_token('2@t.t'))
+        bare_user = self.fresh_user(self.bare_user)
+        # issuing a key for the primary email creates its EmailAddress,
+        # with get_or_create() in a savepoint
+        self.assertQueries('get_confirmation_key of missing primary', 5,
+                           lambda: bare_user.get_confirmation_key())
+
+    def test_write_methods(self):
+        user = self.fresh_user()
+        self.assertQueries('add_confirmed_email', 1,
+                           lambda: user.add_confirmed_email('4@t.t'))
+        self.assertQueries('add_unconfirmed_email', 1,
+                           lambda: user.add_unconfirmed_email('5@t.t'))
+        user = self.fresh_user()
+        self.assertQueries('add_email_if_not_exists, new', 2,
+                           lambda: user.add_email_if_not_exists('6@t.t'))
+        self.assertQueries('add_email_if_not_exists, unconfirmed', 2,
+                           lambda: user.add_email_if_not_exists('6@t.t'))
+        self.assertQueries('add_email_if_not_exists, confirmed', 1,
+                           lambda: user.add_email_if_not_exists('4@t.t'))
+        self.assertQueries('reset_email_confirmation', 1,
+                           lambda: user.reset_email_confirmation('5@t.t'))
+        key = self.fresh_user().get_confirmation_key('5@t.t')
+        self.assertQueries('confirm_email', 2,
+                           lambda: user.confirm_email(key))
+        token = self.fresh_user().get_confirmation_token('6@t.t')
+        self.assertQueries('confirm_email_token', 2,
+                           lambda: user.confirm_email_token(token))
+        self.assertQueries('set_primary_email', 2,
+                           lambda: user.set_primary_email('4@t.t'))
+        self.assertQueries('remove_email', 2,
+                           lambda: user.remove_email('1@t.t'))
+
+    def test_manager_methods(self):
+        manager = EmailAddress.objects
+        user = self.fresh_user()
+        users = [user, self.fresh_user(self.bare_user)]
+        self.assertQueries('create_confirmed', 1,
+                           lambda: manager.create_confirmed('4@t.t', user))
+        self.assertQueries('create_unconfirmed', 1,
+                           lambda: manager.create_unconfirmed('5@t.t', user))
+        self.assertQueries('confirm', 2, lambda: manager.confirm(self.key))
+        self.assertQueries('confirm, already confirmed', 2,
+                           lambda: manager.confirm(self.key))
+        token = self.fresh_user().get_confirmation_token('5@t.t')
+        self.assertQueries('confirm_token', 2,
+                           lambda: manager.confirm_token(token))
+        self.assertQueries(
+            'get_confirmation_statuses', 1,
+            lambda: manager.get_confirmation_statuses(users), read_only=True,
+        )
+        self.assertQueries(
+            'get_confirmation_statuses of pks', 2,
+            lambda: manager.get_confirmation_statuses(
+                [user.pk for user in users],
+            ),
+            read_only=True,
+        )
+        self.assertQueries(
+            'prefetch_email_addresses', 1,
+            lambda: manager.prefetch_email_addresses(users), read_only=True,
+        )
+        self.assertQueries(
+            'bulk_create_unconfirmed', 1,
+            lambda: manager.bulk_create_unconfirmed([(user, '6@t.t')]),
+        )
+        self.assertQueries(
+            'bulk_create_confirmed, ignore', 2,
+            lambda: manager.bulk_create_confirmed(
+                [(user, '6@t.t'), (user, '7@t.t')], on_conflict='ignore',
+            ),
+        )
+        self.assertQueries(
+            'delete_expired, nothing expired', 1,
+            lambda: manager.delete_expired(older_than=timedelta(days=1)),
+        )
+        self.assertQueries(
+            'reset_expired, nothing expired', 1,
+            lambda: manager.reset_expired(older_than=timedelta(days=1)),
+        )
@@ -0,0 +1,16 @@
+from django.conf.urls import include, patterns, url
+from django.contrib import admin
+
+from ..views import confirm_email
+
+admin.autodiscover()
+
+urlpatterns = patterns(
+    '',
+    url(r'^admin/', include(admin.site.urls)),
+    url(r'^email/', include('simple_email_confirmation.urls')),
+    url(
+        r'^redirect/(?P<key>[^/]+)/$', confirm_email,
+        {'success_url': '/done/'},
+    ),
+)
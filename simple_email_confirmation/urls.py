@@ -0,0 +1,11 @@
+from django.conf.urls import patterns, url
+
+from .views import confirm_email
+
+urlpatterns = patterns(
+    '',
+    url(
+        r'^confirm/(?P<key>[^/]+)/$', confirm_email,
+        name='simple_email_confirmation_confirm',
+    ),
+)
@@ -0,0 +1,96 @@
+"""
+An optional view confirming email addresses by key, for the links in your
+confirmation emails. Include simple_email_confirmation.urls in your URLconf,
+or route to confirm_email yourself to pass it options.
+"""
+from __future__ import unicode_literals
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect, render
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.utils.crypto import salted_hmac
+from django.utils.translation import ugettext as _
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .models import EmailAddress
+
+
+STATUS_CODES = {
+    'confirmed': 200,
+    'already_confirmed': 200,
+    'expired': 410,
+    'unknown': 404,
+}
+
+
+def _get_messages():
+    return {
+        'confirmed': _('Your email address is confirmed.'),
+        'already_confirmed': _('Your email address is already confirmed.'),
+        'expired': _('This confirmation link has expired.'),
+        'unknown': _('This confirmation link is invalid.'),
+    }
+
+
+def _etag(key):
+    # only handed out for confirmed keys. Confirmations can be undone, by
+    # resetting the confirmation or removing the address, so a client
+    # sending it back only gets a 304 if the key is still confirmed.
+    return '"{}"'.format(salted_hmac(
+        'simple_email_confirmation.views.confirm_email', key,
+    ).hexdigest())
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+# the key is the secret, a CSRF token wouldn't add anything
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def confirm_email(request, key, template_name=None, success_url=None):
+    """
+    Confirm the email address with the given key, with a single UPDATE
+    query unless something listens to email_confirmed or the confirmation
+    cache is enabled. Responds with `template_name` rendered with `outcome`
+    ('confirmed', 'already_confirmed', 'expired' or 'unknown') and
+    `message`, or a plain text message by default. With `success_url`,
+    confirmed addresses are redirected there instead.
+
+    Successful responses carry an ETag and must be revalidated, so
+    browsers revisiting the link get a 304 while the key is still
+    confirmed.
+    """
+    outcome = EmailAddress._default_manager.confirm_outcome(key)
+    confirmed = outcome in ('confirmed', 'already_confirmed')
+
+    etag = _etag(key)
+    if (confirmed and request.method == 'GET' and
+            _etag_matches(request, etag)):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    if confirmed and success_url is not None:
+        return redirect(success_url)
+
+    message = _get_messages()[outcome]
+    status = STATUS_CODES[outcome]
+    if template_name is not None:
+        response = render(request, template_name, {
+            'outcome': outcome, 'message': message,
+        }, status=status)
+    else:
+        response = HttpResponse(
+            message, content_type='text/plain; charset=utf-8', status=status,
+        )
+
+    if confirmed:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        add_never_cache_headers(response)
+    return response